@@ -0,0 +1,143 @@
+"""
+apsw driver for db.get_conn (DB_DRIVER=apsw)
+
+apsw binds SQLite directly, with less overhead per execute and per row
+than the stdlib sqlite3 module. This wraps it in the part of the sqlite3
+API the models and services use - cursor(), execute(), fetch*(),
+description, row_factory (sqlite3.Row or None), in_transaction and
+commit() - so none of the queries change. apsw is optional - when it
+isn't installed HAVE_APSW is False and db.py stays on sqlite3
+"""
+
+import itertools
+import sqlite3
+
+try:
+    import apsw
+    HAVE_APSW = True
+except ImportError:
+    HAVE_APSW = False
+
+# same as sqlite3.connect's default timeout
+BUSY_TIMEOUT_MS = 5000
+
+
+class Row(tuple):
+    """
+    sqlite3.Row stand-in: index by position or column name, dict(row)
+    works. Subclassed once per column list by row_class
+    """
+    __slots__ = ()
+    _names = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._index[key]
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return list(self._names)
+
+
+_row_classes = {}
+
+
+def row_class(names):
+    """Row subclass for a column list - built once per list (duckdb_engine uses it too)"""
+    cls = _row_classes.get(names)
+    if cls is None:
+        index = {}
+        for i, name in enumerate(names):
+            index.setdefault(name, i)  # duplicate names: first wins, like sqlite3.Row
+        cls = _row_classes[names] = type('Row', (Row,), {'__slots__': (), '_names': names, '_index': index})
+    return cls
+
+
+def _translate(e):
+    # callers catch sqlite3 errors (e.g. a missing optional table)
+    if isinstance(e, apsw.SQLError):
+        return sqlite3.OperationalError(str(e))
+    return sqlite3.DatabaseError(str(e))
+
+
+class Cursor:
+    """sqlite3.Cursor look-alike over an apsw cursor"""
+
+    arraysize = 1
+
+    def __init__(self, conn, row_factory):
+        self._cursor = conn.cursor()
+        self._cursor.setexectrace(self._trace)
+        self.row_factory = row_factory
+        self.description = None
+        self._row_cls = None
+
+    def _trace(self, cursor, sql, bindings):
+        # column names are only certain to be available here - if the
+        # statement returns no rows apsw has already finished it by the
+        # time execute() returns
+        names = tuple(name for name, _ in cursor.getdescription())
+        self.description = tuple((name, None, None, None, None, None, None) for name in names) or None
+        self._row_cls = row_class(names) if names else None
+        return True
+
+    def _wrap(self, rows):
+        if self.row_factory is sqlite3.Row and self._row_cls is not None:
+            return list(map(self._row_cls, rows))
+        return rows
+
+    def execute(self, sql, params=()):
+        self.description = None
+        self._row_cls = None
+        try:
+            # named (dict) or positional params, as with sqlite3
+            self._cursor.execute(sql, params if isinstance(params, dict) else tuple(params))
+        except apsw.Error as e:
+            raise _translate(e) from e
+        return self
+
+    def fetchmany(self, size=None):
+        try:
+            return self._wrap(list(itertools.islice(self._cursor, size or self.arraysize)))
+        except apsw.Error as e:
+            raise _translate(e) from e
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchall(self):
+        try:
+            return self._wrap(list(self._cursor))
+        except apsw.Error as e:
+            raise _translate(e) from e
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class Connection:
+    """sqlite3.Connection look-alike over an apsw connection"""
+
+    def __init__(self, db_path, cached_statements):
+        self._conn = apsw.Connection(db_path, statementcachesize=cached_statements)
+        self._conn.setbusytimeout(BUSY_TIMEOUT_MS)
+        self.row_factory = None
+
+    def cursor(self):
+        return Cursor(self._conn, self.row_factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    @property
+    def in_transaction(self):
+        return not self._conn.getautocommit()
+
+    def commit(self):
+        if self.in_transaction:
+            self._conn.execute('COMMIT')
+
+    def close(self):
+        self._conn.close()
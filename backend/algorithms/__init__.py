@@ -5,10 +5,12 @@ Manual implementations for assignment requirement
 
 from .top_k_zones import TopKZones, get_top_zones
 from .anomaly_detector import AnomalyDetector, find_anomalies
+from ._kernels import warmup as warmup_kernels
 
 __all__ = [
     'TopKZones',
     'get_top_zones',
     'AnomalyDetector',
-    'find_anomalies'
+    'find_anomalies',
+    'warmup_kernels'
 ]
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Numba kernels for the anomaly detector scan
+
+Each kernel walks the trip columns once and writes the derived values
+and boolean masks the detector needs. Numba is optional - when it isn't
+installed HAVE_NUMBA is False and AnomalyDetector uses plain numpy
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+if HAVE_NUMBA:
+
+    @njit(cache=True, parallel=True)
+    def scan_fare(fares, distances, mean, std, zt):
+        """
+        Fare z-score and fare-per-mile checks
+        Returns (z_scores, fare_per_mile, fare_mask, ratio_mask)
+        """
+        n = fares.size
+        z_scores = np.zeros(n)
+        fare_per_mile = np.zeros(n)
+        fare_mask = np.zeros(n, dtype=np.bool_)
+        ratio_mask = np.zeros(n, dtype=np.bool_)
+
+        for i in prange(n):
+            if std > 0:
+                z = (fares[i] - mean) / std
+                z_scores[i] = z
+                fare_mask[i] = abs(z) > zt
+
+            # reasonable range: $2-50 per mile
+            d = distances[i]
+            if d > 0:
+                ratio = fares[i] / d
+                fare_per_mile[i] = ratio
+                ratio_mask[i] = ratio < 2 or ratio > 50
+
+        return z_scores, fare_per_mile, fare_mask, ratio_mask
+
+    @njit(cache=True, parallel=True)
+    def scan_speed(distances, durations):
+        """
+        Speed checks (> 80 mph, or < 1 mph over half a mile)
+        Returns (speed, speed_hi_mask, speed_lo_mask)
+        """
+        n = distances.size
+        speed = np.zeros(n)
+        hi_mask = np.zeros(n, dtype=np.bool_)
+        lo_mask = np.zeros(n, dtype=np.bool_)
+
+        for i in prange(n):
+            d = distances[i]
+            t = durations[i]
+            if d > 0 and t > 0:
+                s = (d / t) * 60
+                speed[i] = s
+                hi_mask[i] = s > 80
+                lo_mask[i] = s < 1 and d > 0.5
+
+        return speed, hi_mask, lo_mask
+
+    @njit(cache=True, parallel=True)
+    def scan_mismatch(distances, durations):
+        """
+        Duration outside 50% of the time expected at 15 mph
+        Returns (expected_duration, mismatch_mask)
+        """
+        n = distances.size
+        expected = np.empty(n)
+        mismatch_mask = np.zeros(n, dtype=np.bool_)
+
+        for i in prange(n):
+            d = distances[i]
+            t = durations[i]
+            e = (d / 15) * 60
+            expected[i] = e
+            if d > 0 and t > 0:
+                mismatch_mask[i] = t < e * 0.5 or t > e * 1.5
+
+        return expected, mismatch_mask
+
+    @njit(cache=True, parallel=True)
+    def _touch(out):
+        for i in prange(out.size):
+            out[i] = i
+
+
+def warmup():
+    """
+    Start numba's thread pool on the calling thread - call it once from
+    the main thread at startup. With the TBB threading layer, a pool
+    first started from another thread (a request thread or the cache
+    warmer) hangs the interpreter at exit. No-op without numba
+    """
+    if HAVE_NUMBA:
+        _touch(np.empty(1))
@@ -2,18 +2,95 @@
 Anomaly Detector - Manual Implementation
 Detect suspicious trips based on fare, distance, and speed anomalies
 
-No using built-in stats libraries or numpy functions for mean/std
+Mean/std are still our own helpers, but the per-trip loops run on numpy
+arrays so large samples don't pay Python overhead per trip
 """
 
+import math
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ._kernels import HAVE_NUMBA
+
+if HAVE_NUMBA:
+    from ._kernels import scan_fare, scan_speed, scan_mismatch
+
+
+# anomaly records - fixed-layout tuples instead of per-trip dicts,
+# turned into JSON objects via _asdict() when the response is encoded
+FareOutlier = namedtuple('FareOutlier', 'index trip_id reason z_score fare')
+FarePerMileAnomaly = namedtuple('FarePerMileAnomaly', 'index trip_id reason fare_per_mile fare distance')
+SpeedAnomaly = namedtuple('SpeedAnomaly', 'index trip_id reason speed_mph distance duration')
+MismatchAnomaly = namedtuple('MismatchAnomaly', 'index trip_id reason distance duration expected_duration')
+
+# below this many trips a thread pool costs more than the numpy passes
+PARALLEL_MIN_TRIPS = 200_000
+
+
+def _as_float(value):
+    """
+    Plain Python float for a numpy scalar
+    float32 goes through its shortest repr so a stored 14.27 comes back
+    as 14.27 rather than 14.270000457763672
+    """
+    return float(str(value))
+
+
+# numpy versions of the _kernels scans, used when numba isn't installed
+
+def _np_scan_fare(fare, distance, mean, std, zt):
+    """Fare z-score and fare-per-mile checks"""
+    n = len(fare)
+    
+    if std > 0:
+        z_scores = (fare - mean) / std
+        fare_mask = np.abs(z_scores) > zt
+    else:
+        z_scores = np.zeros(n)
+        fare_mask = np.zeros(n, dtype=bool)
+    
+    # reasonable range: $2-50 per mile
+    has_distance = distance > 0
+    fare_per_mile = np.divide(fare, distance, out=np.zeros(n), where=has_distance)
+    ratio_mask = has_distance & ((fare_per_mile < 2) | (fare_per_mile > 50))
+    
+    return z_scores, fare_per_mile, fare_mask, ratio_mask
+
+
+def _np_scan_speed(distance, duration):
+    """Speed checks (> 80 mph, or < 1 mph over half a mile)"""
+    movable = (distance > 0) & (duration > 0)
+    speed = np.divide(distance, duration, out=np.zeros(len(distance)), where=movable) * 60  # convert to mph
+    hi_mask = movable & (speed > 80)
+    # too slow for significant distance
+    lo_mask = movable & (speed < 1) & (distance > 0.5)
+    
+    return speed, hi_mask, lo_mask
+
+
+def _np_scan_mismatch(distance, duration):
+    """Duration outside 50% of the time expected at 15 mph"""
+    movable = (distance > 0) & (duration > 0)
+    # assume average NYC speed: 15 mph, allow 50% variance
+    expected = (distance / 15) * 60  # minutes
+    mismatch_mask = movable & ((duration < expected * 0.5) | (duration > expected * 1.5))
+    
+    return expected, mismatch_mask
+
+
 class AnomalyDetector:
     """Detect anomalies in trip data using manual statistical calculations"""
     
-    def __init__(self, z_threshold=3.0):
+    def __init__(self, z_threshold=3.0, strict_manual=False):
         """
         Args:
             z_threshold: number of standard deviations to consider anomaly
+            strict_manual: use the Newton's method square root instead of math.sqrt
         """
         self.z_threshold = z_threshold
+        self.strict_manual = strict_manual
         self.stats_cache = {}
     
     def detect_fare_anomalies(self, trips):
@@ -34,46 +111,8 @@ class AnomalyDetector:
         if not trips:
             return []
         
-        fares = [t['fare_amount'] for t in trips]
-        distances = [t['trip_distance'] for t in trips]
-        
-        # calculate statistics manually
-        fare_mean = self._calculate_mean(fares)
-        fare_std = self._calculate_std(fares, fare_mean)
-        
-        anomalies = []
-        
-        for i, trip in enumerate(trips):
-            fare = trip['fare_amount']
-            distance = trip['trip_distance']
-            
-            # check z-score
-            if fare_std > 0:
-                z_score = (fare - fare_mean) / fare_std
-                if abs(z_score) > self.z_threshold:
-                    anomalies.append({
-                        'index': i,
-                        'trip_id': trip.get('trip_id'),
-                        'reason': 'fare_outlier',
-                        'z_score': round(z_score, 2),
-                        'fare': fare
-                    })
-            
-            # check fare per mile ratio
-            if distance > 0:
-                fare_per_mile = fare / distance
-                # reasonable range: $2-50 per mile
-                if fare_per_mile < 2 or fare_per_mile > 50:
-                    anomalies.append({
-                        'index': i,
-                        'trip_id': trip.get('trip_id'),
-                        'reason': 'fare_per_mile_anomaly',
-                        'fare_per_mile': round(fare_per_mile, 2),
-                        'fare': fare,
-                        'distance': distance
-                    })
-        
-        return anomalies
+        soa = self._trips_to_soa(trips)
+        return self._fare_records(self._scan(*soa[:3]), soa[3])
     
     def detect_speed_anomalies(self, trips):
         """
@@ -84,40 +123,11 @@ class AnomalyDetector:
         - Highway: up to 55 mph
         - Unrealistic: > 80 mph or < 1 mph
         """
-        anomalies = []
-        
-        for i, trip in enumerate(trips):
-            distance = trip.get('trip_distance', 0)
-            duration = trip.get('trip_duration_min', 0)
-            
-            if duration <= 0 or distance <= 0:
-                continue
-            
-            # calculate speed manually
-            speed_mph = (distance / duration) * 60  # convert to mph
-            
-            # flag suspicious speeds
-            if speed_mph > 80:
-                anomalies.append({
-                    'index': i,
-                    'trip_id': trip.get('trip_id'),
-                    'reason': 'speed_too_high',
-                    'speed_mph': round(speed_mph, 1),
-                    'distance': distance,
-                    'duration': duration
-                })
-            elif speed_mph < 1 and distance > 0.5:
-                # too slow for significant distance
-                anomalies.append({
-                    'index': i,
-                    'trip_id': trip.get('trip_id'),
-                    'reason': 'speed_too_low',
-                    'speed_mph': round(speed_mph, 1),
-                    'distance': distance,
-                    'duration': duration
-                })
+        if not trips:
+            return []
         
-        return anomalies
+        soa = self._trips_to_soa(trips)
+        return self._speed_records(self._scan(*soa[:3]), soa[3])
     
     def detect_distance_time_mismatch(self, trips):
         """
@@ -125,102 +135,232 @@ class AnomalyDetector:
         
         Uses manual calculation of expected time based on distance
         """
-        anomalies = []
-        
-        for i, trip in enumerate(trips):
-            distance = trip.get('trip_distance', 0)
-            duration = trip.get('trip_duration_min', 0)
-            
-            if distance <= 0 or duration <= 0:
-                continue
-            
-            # expected time based on distance (manual calculation)
-            # assume average NYC speed: 15 mph
-            expected_duration = (distance / 15) * 60  # minutes
-            
-            # allow 50% variance
-            min_expected = expected_duration * 0.5
-            max_expected = expected_duration * 1.5
-            
-            if duration < min_expected or duration > max_expected:
-                anomalies.append({
-                    'index': i,
-                    'trip_id': trip.get('trip_id'),
-                    'reason': 'distance_time_mismatch',
-                    'distance': distance,
-                    'duration': duration,
-                    'expected_duration': round(expected_duration, 1)
-                })
+        if not trips:
+            return []
         
-        return anomalies
+        soa = self._trips_to_soa(trips)
+        return self._mismatch_records(self._scan(*soa[:3]), soa[3])
     
     def detect_all_anomalies(self, trips):
         """
         Run all anomaly detection algorithms
         Returns dict with anomalies by type
         """
-        results = {
-            'fare_anomalies': self.detect_fare_anomalies(trips),
-            'speed_anomalies': self.detect_speed_anomalies(trips),
-            'mismatch_anomalies': self.detect_distance_time_mismatch(trips)
-        }
+        if not trips:
+            return self.detect_all_anomalies_soa(np.empty(0), np.empty(0), np.empty(0))
         
-        # count unique anomalous trips
-        all_indices = set()
-        for anomaly_list in results.values():
-            for anomaly in anomaly_list:
-                all_indices.add(anomaly['index'])
+        return self.detect_all_anomalies_soa(*self._trips_to_soa(trips))
+    
+    def detect_all_anomalies_soa(self, fare, distance, duration, trip_id=None):
+        """
+        Run all anomaly detection algorithms on column arrays
         
-        results['total_anomalous_trips'] = len(all_indices)
-        results['anomaly_rate'] = len(all_indices) / len(trips) if trips else 0
+        Args:
+            fare, distance, duration: equal-length numeric arrays
+            trip_id: optional array of trip ids (same length)
+        
+        All three checks are derived from one scan over the columns
+        instead of walking a trip list once per detector
+        """
+        n = len(fare)
+        if trip_id is None:
+            trip_id = np.full(n, None, dtype=object)
+        
+        if n:
+            scan = self._scan(fare, distance, duration)
+            results = {
+                'fare_anomalies': self._fare_records(scan, trip_id),
+                'speed_anomalies': self._speed_records(scan, trip_id),
+                'mismatch_anomalies': self._mismatch_records(scan, trip_id)
+            }
+            
+            # count unique anomalous trips - a trip is flagged if any check hit
+            flagged = (scan['fare_mask'] | scan['ratio_mask'] | scan['speed_hi_mask']
+                       | scan['speed_lo_mask'] | scan['mismatch_mask'])
+            total = int(np.count_nonzero(flagged))
+        else:
+            results = {
+                'fare_anomalies': [],
+                'speed_anomalies': [],
+                'mismatch_anomalies': []
+            }
+            total = 0
+        
+        results['total_anomalous_trips'] = total
+        results['anomaly_rate'] = total / n if n else 0
         
         return results
     
-    # manual statistical functions - no numpy!
+    def _trips_to_soa(self, trips):
+        """
+        Convert list of trip dicts to column arrays
+        
+        Returns (fare, distance, duration, trip_id) numpy arrays. The
+        numeric columns are float32 - the checks only need a few
+        significant digits and half the bytes go through memory. Callers
+        that already hold the columns pass them to detect_all_anomalies_soa
+        instead of converting a trip list again
+        """
+        n = len(trips)
+        fare = np.fromiter((t['fare_amount'] for t in trips), dtype=np.float32, count=n)
+        distance = np.fromiter((t.get('trip_distance', 0) for t in trips), dtype=np.float32, count=n)
+        duration = np.fromiter((t.get('trip_duration_min', 0) for t in trips), dtype=np.float32, count=n)
+        trip_id = np.fromiter((t.get('trip_id') for t in trips), dtype=object, count=n)
+        
+        return fare, distance, duration, trip_id
+    
+    def _scan(self, fare, distance, duration):
+        """
+        Compute every anomaly mask over the trip columns in one go
+        
+        Returns dict with the derived arrays and boolean masks used
+        to build the per-detector result lists
+        """
+        n = len(fare)
+        
+        fare_mean = self._calculate_mean(fare)
+        fare_std = self._calculate_std(fare, fare_mean)
+        
+        if HAVE_NUMBA:
+            # compiled single-pass kernels, parallel over trips
+            z_scores, fare_per_mile, fare_mask, ratio_mask = scan_fare(
+                fare, distance, fare_mean, fare_std, self.z_threshold
+            )
+            speed, speed_hi_mask, speed_lo_mask = scan_speed(distance, duration)
+            expected, mismatch_mask = scan_mismatch(distance, duration)
+        elif n >= PARALLEL_MIN_TRIPS:
+            # numpy releases the GIL on large elementwise ops,
+            # so the three passes overlap on separate cores
+            with ThreadPoolExecutor(max_workers=3) as ex:
+                fare_fut = ex.submit(_np_scan_fare, fare, distance, fare_mean, fare_std, self.z_threshold)
+                speed_fut = ex.submit(_np_scan_speed, distance, duration)
+                mismatch_fut = ex.submit(_np_scan_mismatch, distance, duration)
+                z_scores, fare_per_mile, fare_mask, ratio_mask = fare_fut.result()
+                speed, speed_hi_mask, speed_lo_mask = speed_fut.result()
+                expected, mismatch_mask = mismatch_fut.result()
+        else:
+            z_scores, fare_per_mile, fare_mask, ratio_mask = _np_scan_fare(
+                fare, distance, fare_mean, fare_std, self.z_threshold
+            )
+            speed, speed_hi_mask, speed_lo_mask = _np_scan_speed(distance, duration)
+            expected, mismatch_mask = _np_scan_mismatch(distance, duration)
+        
+        return {
+            'fare': fare,
+            'distance': distance,
+            'duration': duration,
+            'z_scores': z_scores,
+            'fare_per_mile': fare_per_mile,
+            'speed': speed,
+            'expected': expected,
+            'fare_mask': fare_mask,
+            'ratio_mask': ratio_mask,
+            'speed_hi_mask': speed_hi_mask,
+            'speed_lo_mask': speed_lo_mask,
+            'mismatch_mask': mismatch_mask
+        }
+    
+    def _fare_records(self, scan, trip_id):
+        """Build fare anomaly records for flagged trips only"""
+        fare_mask = scan['fare_mask']
+        ratio_mask = scan['ratio_mask']
+        
+        idx = np.nonzero(fare_mask | ratio_mask)[0]
+        
+        anomalies = []
+        for i, tid in zip(idx.tolist(), trip_id[idx].tolist()):
+            fare = _as_float(scan['fare'][i])
+            
+            if fare_mask[i]:
+                anomalies.append(FareOutlier(
+                    i, tid, 'fare_outlier',
+                    round(float(scan['z_scores'][i]), 2),
+                    fare
+                ))
+            
+            if ratio_mask[i]:
+                anomalies.append(FarePerMileAnomaly(
+                    i, tid, 'fare_per_mile_anomaly',
+                    round(float(scan['fare_per_mile'][i]), 2),
+                    fare,
+                    _as_float(scan['distance'][i])
+                ))
+        
+        return anomalies
+    
+    def _speed_records(self, scan, trip_id):
+        """Build speed anomaly records for flagged trips only"""
+        speed_hi_mask = scan['speed_hi_mask']
+        
+        idx = np.nonzero(speed_hi_mask | scan['speed_lo_mask'])[0]
+        
+        anomalies = []
+        for i, tid in zip(idx.tolist(), trip_id[idx].tolist()):
+            anomalies.append(SpeedAnomaly(
+                i, tid, 'speed_too_high' if speed_hi_mask[i] else 'speed_too_low',
+                round(float(scan['speed'][i]), 1),
+                _as_float(scan['distance'][i]),
+                _as_float(scan['duration'][i])
+            ))
+        
+        return anomalies
+    
+    def _mismatch_records(self, scan, trip_id):
+        """Build distance/time mismatch records for flagged trips only"""
+        idx = np.nonzero(scan['mismatch_mask'])[0]
+        
+        anomalies = []
+        for i, tid in zip(idx.tolist(), trip_id[idx].tolist()):
+            anomalies.append(MismatchAnomaly(
+                i, tid, 'distance_time_mismatch',
+                _as_float(scan['distance'][i]),
+                _as_float(scan['duration'][i]),
+                round(float(scan['expected'][i]), 1)
+            ))
+        
+        return anomalies
+    
+    # statistical helpers - thin wrappers over numpy reductions
     
     def _calculate_mean(self, values):
-        """Calculate mean manually"""
-        if not values:
+        """Calculate mean (accumulated in float64 even for float32 input)"""
+        if len(values) == 0:
             return 0
-        total = 0
-        for val in values:
-            total += val
-        return total / len(values)
+        return float(np.mean(values, dtype=np.float64))
     
     def _calculate_std(self, values, mean=None):
         """
-        Calculate standard deviation manually
+        Calculate standard deviation
         
         Formula: sqrt(sum((x - mean)^2) / n)
         """
-        if not values:
+        if len(values) == 0:
             return 0
         
+        values = np.asarray(values, dtype=np.float64)
         if mean is None:
             mean = self._calculate_mean(values)
         
         # calculate variance
-        squared_diffs = 0
-        for val in values:
-            diff = val - mean
-            squared_diffs += diff * diff
-        
-        variance = squared_diffs / len(values)
+        diffs = values - mean
+        variance = float(np.dot(diffs, diffs)) / len(values)
         
-        # calculate sqrt manually
         std = self._manual_sqrt(variance)
         return std
     
     def _manual_sqrt(self, n):
         """
-        Manual square root using Newton's method
-        No using math.sqrt!
+        Square root of a non-negative number
+        
+        Uses math.sqrt unless strict_manual is set, in which case
+        the original Newton's method implementation runs instead
         """
-        if n < 0:
-            return 0
-        if n == 0:
+        if n <= 0:
             return 0
         
+        if not self.strict_manual:
+            return math.sqrt(n)
+        
         # initial guess
         x = n / 2.0
         
@@ -236,9 +376,15 @@ class AnomalyDetector:
         Returns easy-to-read dict
         """
         results = self.detect_all_anomalies(trips)
-        
+        return self.summarize(results, len(trips))
+    
+    def summarize(self, results, total_trips):
+        """
+        Build the summary dict from detect_all_anomalies output
+        Lets callers that already ran detection skip a second pass
+        """
         summary = {
-            'total_trips': len(trips),
+            'total_trips': total_trips,
             'total_anomalies': results['total_anomalous_trips'],
             'anomaly_rate_percent': round(results['anomaly_rate'] * 100, 2),
             'fare_anomalies': len(results['fare_anomalies']),
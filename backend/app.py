@@ -3,24 +3,45 @@ Flask Backend API for NYC Taxi Data Explorer
 """
 
 from flask import Flask, jsonify
+from flask.logging import default_handler
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import logging
+import orjson
 import os
+import sqlite3
 import sys
-from dotenv import load_dotenv
 
 # add parent dir to import our modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config import get_config
+from algorithms import warmup_kernels
+from cache import start_warmer
+from db import end_transactions, ensure_indexes
+from responses import JSON_OPTIONS, json_default
 from routes.trips import trips_bp
 from routes.zones import zones_bp
 from routes.insights import insights_bp
 
-load_dotenv()
+class ORJSONProvider(DefaultJSONProvider):
+    """jsonify() backed by orjson - same output, C-speed encoding"""
+    
+    def dumps(self, obj, **kwargs):
+        option = JSON_OPTIONS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=json_default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 # Initialize Flask app with config
 config = get_config()
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.config.from_object(config)
 CORS(app, origins=app.config['CORS_ORIGINS'])
 
@@ -29,6 +50,43 @@ app.register_blueprint(trips_bp)
 app.register_blueprint(zones_bp)
 app.register_blueprint(insights_bp)
 
+# background warmer and DuckDB messages go out the same way as app.logger's
+for name in ('cache', 'duckdb_engine'):
+    logging.getLogger(name).addHandler(default_handler)
+
+# model/service connections are per-thread and outlive the request
+app.teardown_appcontext(end_transactions)
+
+def start_background():
+    """
+    Index migrations, the numba thread pool and the cache warmer - once
+    per serving process
+    """
+    # Apply missing index migrations
+    try:
+        ensure_indexes(app.config['DB_PATH'], app.config['STARTUP_INDEXES'], app.config['STARTUP_FTS_TABLES'])
+    except sqlite3.Error as e:
+        # not seeded yet, or read-only - queries still work, just slower
+        print(f"Warning: could not apply index migrations: {e}")
+    
+    # Start the numba thread pool here on the main thread, before the
+    # warmer thread or any request runs a kernel
+    warmup_kernels()
+    
+    # Precompute the slow analytics endpoints in the background
+    if app.config['WARM_INTERVAL'] > 0:
+        start_warmer(app.config['WARM_INTERVAL'])
+
+# `python app.py` in debug mode runs Werkzeug's reloader: this process
+# only watches files and re-runs the script in a child (with
+# WERKZEUG_RUN_MAIN=true) that serves the requests. Only that child - or
+# any process importing the app to serve it (flask run, a WSGI server) -
+# starts the background work
+RELOADER_PARENT = (__name__ == '__main__' and app.debug
+                   and os.environ.get('WERKZEUG_RUN_MAIN') != 'true')
+if not RELOADER_PARENT:
+    start_background()
+
 @app.route('/')
 def home():
     return jsonify({
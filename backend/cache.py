@@ -0,0 +1,219 @@
+"""
+Result cache for read-only API endpoints
+
+The trip data doesn't change between seeds, so aggregation results are
+memoized in a process-local TTL cache keyed on (name, args). The
+slowest analytics are also kept warm by a background thread, so no
+request has to wait on them. Everything is dropped as soon as the
+database file changes (a reseed), not just when the TTL runs out
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import orjson
+from cachetools import TTLCache
+from cachetools.keys import hashkey
+from flask import Response, request
+
+from config import Config
+from responses import JSON_OPTIONS, json_default
+
+result_cache = TTLCache(maxsize=256, ttl=Config.CACHE_DEFAULT_TIMEOUT)
+response_cache = TTLCache(maxsize=256, ttl=Config.CACHE_DEFAULT_TIMEOUT)
+count_cache = TTLCache(maxsize=1024, ttl=Config.COUNT_CACHE_TIMEOUT)
+cache_lock = threading.Lock()
+
+_MISSING = object()
+
+logger = logging.getLogger(__name__)
+
+# warmed results - (name, fn, args) jobs rerun every WARM_INTERVAL seconds
+_warm_jobs = []
+# replaced wholesale on every update, never mutated, so readers don't lock
+_snapshots = {}
+_warm_wake = threading.Event()
+_warmer = None
+
+# clears of memoized lookups (e.g. models.zone.clear_zone_cache), run
+# with every flush
+_flush_hooks = []
+
+# stat of the database file (and its WAL) when the caches were filled
+_data_version = None
+
+
+def _current_data_version():
+    version = []
+    for path in (Config.DB_PATH, Config.DB_PATH + '-wal'):
+        try:
+            st = os.stat(path)
+        except OSError:
+            version.append(None)
+        else:
+            version.append((st.st_mtime_ns, st.st_size))
+    return tuple(version)
+
+
+def _check_data_version():
+    """Flush everything if the database was written since the last check"""
+    global _data_version
+    version = _current_data_version()
+    
+    # compare and swap under the lock so concurrent requests flush once
+    with cache_lock:
+        if version == _data_version:
+            return
+        # the first check only records the version - nothing is cached yet
+        changed = _data_version is not None
+        _data_version = version
+        if changed:
+            _clear_results()
+    
+    if changed:
+        _after_flush()
+
+
+def cached_call(name, fn, *args):
+    """
+    Call fn(*args), reusing the result for the same name and args
+    for CACHE_DEFAULT_TIMEOUT seconds
+
+    name identifies the result explicitly, so this also works outside
+    a request (e.g. from the warmer thread)
+    """
+    _check_data_version()
+    key = hashkey(name, *args)
+
+    with cache_lock:
+        value = result_cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    # compute outside the lock so slow queries don't block other endpoints
+    value = fn(*args)
+
+    with cache_lock:
+        result_cache[key] = value
+    return value
+
+
+def cached_json(name, fn, *args):
+    """
+    Like cached_call, but caches the serialized JSON body and its ETag
+
+    Repeat requests return the stored bytes without re-encoding, and a
+    matching If-None-Match gets a 304 with no body. Builds a response,
+    so only call it from a route
+    """
+    _check_data_version()
+    key = hashkey(name, *args)
+
+    with cache_lock:
+        entry = response_cache.get(key)
+
+    if entry is None:
+        body = orjson.dumps(fn(*args), default=json_default, option=JSON_OPTIONS)
+        entry = (hashlib.md5(body).hexdigest(), body)
+        with cache_lock:
+            response_cache[key] = entry
+
+    etag, body = entry
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+
+def cached_count(fn, filters):
+    """
+    Call fn(filters) for a trip count, reusing it for the same filter
+    set for COUNT_CACHE_TIMEOUT seconds
+
+    Pagination totals only need to be roughly current, and paging
+    through results repeats the same filters on every request
+    """
+    _check_data_version()
+    key = frozenset(filters.items())
+
+    with cache_lock:
+        total = count_cache.get(key)
+    if total is None:
+        total = fn(filters)
+        with cache_lock:
+            count_cache[key] = total
+    return total
+
+
+def warm(name, fn, *args):
+    """Have the background warmer keep fn(*args) computed under name"""
+    _warm_jobs.append((name, fn, args))
+
+
+def snapshot(name):
+    """Latest warmed result for name, or None until it's first computed"""
+    _check_data_version()
+    return _snapshots.get(name)
+
+
+def _refresh_snapshots():
+    global _snapshots
+    for name, fn, args in _warm_jobs:
+        try:
+            value = fn(*args)
+        except Exception:
+            # keep serving the previous snapshot (or computing on demand)
+            logger.exception("could not warm %s", name)
+            continue
+        with cache_lock:
+            _snapshots = {**_snapshots, name: value}
+
+
+def _warm_loop(interval):
+    while True:
+        _refresh_snapshots()
+        _warm_wake.wait(interval)
+        _warm_wake.clear()
+
+
+def start_warmer(interval):
+    """Start the background warmer thread, refreshing every interval seconds"""
+    global _warmer
+    if _warmer is None:
+        _warmer = threading.Thread(target=_warm_loop, args=(interval,), name='cache-warmer', daemon=True)
+        _warmer.start()
+
+
+def on_flush(clear):
+    """Have flush_caches also call clear (e.g. models.zone.clear_zone_cache)"""
+    _flush_hooks.append(clear)
+
+
+def flush_caches():
+    """
+    Drop every cached result - done automatically when the database
+    file changes, or on POST /api/cache/flush
+    """
+    with cache_lock:
+        _clear_results()
+    _after_flush()
+
+
+def _clear_results():
+    """Empty the result caches and snapshots - caller holds cache_lock"""
+    global _snapshots
+    result_cache.clear()
+    response_cache.clear()
+    count_cache.clear()
+    _snapshots = {}
+
+
+def _after_flush():
+    # hooks run outside cache_lock - they may take their own locks
+    for clear in _flush_hooks:
+        clear()
+    # recompute the warmed results now rather than at the next interval
+    _warm_wake.set()
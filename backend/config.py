@@ -4,10 +4,19 @@ Configuration settings for NYC Taxi Data Explorer API
 
 import os
 from pathlib import Path
+from dotenv import load_dotenv
+
+# .env is read once, here - everything below (and every module that
+# imports from config) sees its values
+load_dotenv()
 
 # Base directory
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Database file - the models and services default to this, so they all
+# open the same database as the app
+DB_PATH = os.getenv('DB_PATH', str(BASE_DIR / 'database' / 'nyc_taxi.db'))
+
 class Config:
     """Base configuration"""
     
@@ -20,7 +29,36 @@ class Config:
     API_HOST = os.getenv('API_HOST', '0.0.0.0')
     
     # Database settings
-    DB_PATH = os.getenv('DB_PATH', str(BASE_DIR / 'database' / 'nyc_taxi.db'))
+    DB_PATH = DB_PATH
+    # 'sqlite3' or 'apsw' (needs the optional apsw package)
+    DB_DRIVER = os.getenv('DB_DRIVER', 'sqlite3')
+    # 'sqlite' or 'duckdb' - where the analytics GROUP BY scans of
+    # trips run (duckdb needs the optional duckdb package)
+    ANALYTICS_ENGINE = os.getenv('ANALYTICS_ENGINE', 'sqlite')
+    
+    # Index migrations - applied at startup when missing, so databases
+    # seeded before these were added get them too (also in indexes.sql)
+    STARTUP_INDEXES = [
+        # zone stats - one search per side (same names as indexes.sql)
+        "CREATE INDEX IF NOT EXISTS idx_pickup_location ON trips(pickup_location_id)",
+        "CREATE INDEX IF NOT EXISTS idx_dropoff_location ON trips(dropoff_location_id)",
+        # covers pickup counts + revenue per zone (top zones / insights)
+        "CREATE INDEX IF NOT EXISTS idx_trips_pickup_fare ON trips(pickup_location_id, fare_amount)",
+        # zone filter + ORDER BY pickup_datetime on /api/trips
+        "CREATE INDEX IF NOT EXISTS idx_trips_pickup_time ON trips(pickup_location_id, pickup_datetime)",
+        "CREATE INDEX IF NOT EXISTS idx_trips_dropoff_time ON trips(dropoff_location_id, pickup_datetime)",
+        # covers date range + fare filters, so COUNT(*) never reads the table rows
+        "CREATE INDEX IF NOT EXISTS idx_trips_time_fare ON trips(pickup_datetime, fare_amount)",
+        # Zone.search's LIKE 'prefix%' fallback
+        "CREATE INDEX IF NOT EXISTS idx_zones_name_nocase ON zones(zone COLLATE NOCASE)",
+        # full-text zone search (filled by STARTUP_FTS_TABLES below)
+        "CREATE VIRTUAL TABLE IF NOT EXISTS zones_fts USING fts5(zone, borough, "
+        "content='zones', content_rowid='location_id', tokenize='unicode61')",
+    ]
+    # external-content full-text tables rebuilt at startup only while
+    # their index is empty (just created above) - indexes.sql fills them
+    # on a seed, so normal boots don't write
+    STARTUP_FTS_TABLES = ['zones_fts']
     
     # CORS settings
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
@@ -33,9 +71,13 @@ class Config:
     MAX_QUERY_LIMIT = 10000
     DEFAULT_QUERY_LIMIT = 100
     
-    # Cache settings (for future use)
+    # Cache settings (TTL for the endpoint result cache)
     CACHE_TYPE = 'simple'
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
+    COUNT_CACHE_TIMEOUT = 60  # filtered trip counts for pagination
+    # seconds between background refreshes of the slow analytics
+    # endpoints (insights, anomalies, borough comparison); 0 turns it off
+    WARM_INTERVAL = int(os.getenv('WARM_INTERVAL', 300))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -0,0 +1,164 @@
+"""
+Shared SQLite connections
+
+Each thread keeps one open connection per database file instead of
+calling sqlite3.connect on every query, so SQLite's page cache and the
+mmap of the (large) database file stay warm between requests
+"""
+
+import sqlite3
+import threading
+
+import _apsw
+from config import Config
+
+_local = threading.local()
+
+# DB_DRIVER=apsw swaps in apsw's thinner bindings (see _apsw.py) when
+# it's installed; otherwise connections are stdlib sqlite3
+USE_APSW = Config.DB_DRIVER == 'apsw' and _apsw.HAVE_APSW
+
+# read-heavy tuning: map the file, ~200 MB page cache, temp b-trees in RAM
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=30000000000',
+    'PRAGMA cache_size=-200000',
+    'PRAGMA temp_store=MEMORY',
+)
+
+# trips stores fare_amount, tip_amount and total_amount as INTEGER cents,
+# trip_distance and avg_speed_mph as INTEGER hundredths (schema.sql) -
+# 2-3 byte integers on disk instead of 8 byte REALs. Queries divide by
+# 100.0 on the way out, so the API still sees dollars, miles and mph
+SCALED_TRIP_COLUMNS = ('trip_distance', 'fare_amount', 'tip_amount', 'total_amount', 'avg_speed_mph')
+TRIP_COLUMNS = (
+    'trip_id', 'pickup_datetime', 'dropoff_datetime', 'passenger_count',
+    'trip_distance', 'pickup_location_id', 'dropoff_location_id',
+    'fare_amount', 'tip_amount', 'total_amount',
+    'trip_duration_min', 'avg_speed_mph', 'pickup_hour',
+)
+
+# sqlite3 keeps compiled statements per connection, keyed by SQL text.
+# The filter builders emit predicates in a fixed order, so every filter
+# combination maps to one text - size the cache so they all stay prepared
+CACHED_STATEMENTS = 512
+
+
+def get_conn(db_path):
+    """
+    Get this thread's connection to db_path, opening it on first use
+
+    Rows come back as sqlite3.Row. The connection is in autocommit
+    mode, so reads never hold a transaction open and WAL readers don't
+    block the writer. It's shared - callers must not close it
+    """
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(db_path)
+    if conn is None:
+        if USE_APSW:
+            conn = _apsw.Connection(db_path, cached_statements=CACHED_STATEMENTS)
+        else:
+            conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None,
+                                   cached_statements=CACHED_STATEMENTS)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conns[db_path] = conn
+
+    return conn
+
+
+def trip_columns(alias=''):
+    """
+    SELECT list for every trips column, in table order, with the scaled
+    columns converted back (use in place of trips.* / t.*)
+    """
+    prefix = f'{alias}.' if alias else ''
+    return ', '.join(
+        f'{prefix}{name} / 100.0 as {name}' if name in SCALED_TRIP_COLUMNS else prefix + name
+        for name in TRIP_COLUMNS)
+
+
+def to_hundredths(value):
+    """A dollars/miles filter value in the stored hundredths"""
+    # rounded so 0.29 * 100 (28.999...) still matches a stored 29
+    return round(value * 100, 6)
+
+
+def has_table(cur, name):
+    """Check whether a table (e.g. a precomputed aggregate) exists"""
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cur.fetchone() is not None
+
+
+def fetch_columns(cur, query, params=()):
+    """
+    Run query and return (column names, rows) with rows as plain tuples
+
+    For results that go straight out as JSON - skips building a
+    sqlite3.Row and then a dict for every row
+    """
+    cur.row_factory = None
+    cur.execute(query, params)
+    return [d[0] for d in cur.description], cur.fetchall()
+
+
+def fetch_dicts(cur):
+    """
+    Fetch the rest of an executed query's rows as dicts
+
+    Rows are read as plain tuples and zipped with the column names,
+    which are looked up once - cheaper than building a sqlite3.Row for
+    every row and then copying it into a dict
+    """
+    cur.row_factory = None
+    names = [d[0] for d in cur.description]
+    return [dict(zip(names, row)) for row in cur.fetchall()]
+
+
+def end_transactions(exc=None):
+    """
+    Commit anything left open on this thread's connections
+    Registered as a Flask teardown - connections stay open
+    """
+    for conn in getattr(_local, 'conns', {}).values():
+        if conn.in_transaction:
+            conn.commit()
+
+
+def ensure_indexes(db_path, statements, fts_tables=()):
+    """
+    Run idempotent CREATE INDEX IF NOT EXISTS statements, fill any of
+    the fts_tables whose index is still empty, then refresh the query
+    planner's statistics
+
+    Building an index on a large trips table takes a while, but only
+    the first time - afterwards each statement is a no-op
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+
+        # an external-content FTS5 table reads COUNT(*) from its content
+        # table, so emptiness is checked on the index's own docsize table
+        for table in fts_tables:
+            if conn.execute(f'SELECT 1 FROM {table}_docsize LIMIT 1').fetchone() is None:
+                conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+        conn.commit()
+
+        # databases seeded before indexes.sql ran ANALYZE have no stats
+        # at all - gather them once; afterwards PRAGMA optimize only
+        # re-analyzes tables whose stats have drifted
+        if has_table(conn.cursor(), 'sqlite_stat1'):
+            conn.execute('PRAGMA optimize')
+        else:
+            conn.execute('ANALYZE')
+        conn.commit()
+    finally:
+        conn.close()
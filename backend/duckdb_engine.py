@@ -0,0 +1,93 @@
+"""
+DuckDB engine for the analytics scans (ANALYTICS_ENGINE=duckdb)
+
+The analytics fall back to GROUP BY/SUM/AVG over the whole trips table
+when the aggregate tables aren't there. DuckDB runs those vectorized,
+column at a time, instead of stepping SQLite's row-store one row at a
+time. It reads the SQLite database file directly, through its sqlite
+extension, attached read-only - nothing is copied and the results always
+match what's on disk. duckdb is optional - when it isn't installed, or
+the database can't be attached, HAVE_DUCKDB/available() are False and
+the analytics stay on SQLite
+
+(Not named _duckdb.py - that's duckdb's own compiled module, which this
+file would shadow with the backend directory on sys.path)
+"""
+
+import logging
+import sqlite3
+import threading
+
+from _apsw import row_class
+
+try:
+    import duckdb
+    HAVE_DUCKDB = True
+except ImportError:
+    HAVE_DUCKDB = False
+
+# schema name the SQLite file is attached under - every cursor USEs it,
+# so the queries keep their unqualified trips/zones table names
+ATTACHED = 'taxi'
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# db_path -> in-memory DuckDB with the file attached (None if attaching failed)
+_databases = {}
+_local = threading.local()
+
+
+def _database(db_path):
+    with _lock:
+        if db_path not in _databases:
+            try:
+                db = duckdb.connect()
+                path = db_path.replace("'", "''")
+                db.execute(f"ATTACH '{path}' AS {ATTACHED} (TYPE sqlite, READ_ONLY)")
+            except duckdb.Error:
+                # e.g. the sqlite extension isn't installed and can't be downloaded
+                logger.warning("DuckDB unavailable, analytics stay on SQLite", exc_info=True)
+                db = None
+            _databases[db_path] = db
+        return _databases[db_path]
+
+
+def _cursor(db_path):
+    # one cursor per thread - a DuckDB connection isn't safe to share
+    # between threads, its cursors are
+    cursors = getattr(_local, 'cursors', None)
+    if cursors is None:
+        cursors = _local.cursors = {}
+
+    cur = cursors.get(db_path)
+    if cur is None:
+        db = _database(db_path)
+        if db is None:
+            return None
+        cur = db.cursor()
+        cur.execute(f'USE {ATTACHED}')
+        cursors[db_path] = cur
+    return cur
+
+
+def available(db_path):
+    """Whether db_path can be queried through DuckDB"""
+    return HAVE_DUCKDB and _database(db_path) is not None
+
+
+def fetchall(db_path, sql, params=()):
+    """
+    Run sql (qmark params, like sqlite3) against db_path on DuckDB
+
+    Rows index by position or column name, like sqlite3.Row. Errors are
+    raised as sqlite3 errors, which is what callers already catch
+    """
+    cur = _cursor(db_path)
+    try:
+        cur.execute(sql, list(params))
+        rows = cur.fetchall()
+    except duckdb.Error as e:
+        raise sqlite3.OperationalError(str(e)) from e
+    cls = row_class(tuple(d[0] for d in cur.description))
+    return list(map(cls, rows))
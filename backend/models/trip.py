@@ -4,30 +4,51 @@ Trip model - handles trip data from database
 
 import sqlite3
 from datetime import datetime
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from config import DB_PATH
+from db import get_conn, fetch_columns, fetch_dicts, to_hundredths, trip_columns
+
+# (filter key, predicate) in the order they appear in the WHERE clause
+FILTER_PREDICATES = (
+    ('start_date', 'pickup_datetime >= ?'),
+    ('end_date', 'pickup_datetime <= ?'),
+    ('min_fare', 'fare_amount >= ?'),
+    ('max_fare', 'fare_amount <= ?'),
+    ('min_distance', 'trip_distance >= ?'),
+    ('max_distance', 'trip_distance <= ?'),
+    ('pickup_location_id', 'pickup_location_id = ?'),
+    ('dropoff_location_id', 'dropoff_location_id = ?'),
+)
+
+# filters on columns stored in hundredths (db.SCALED_TRIP_COLUMNS) -
+# their values are scaled to match
+SCALED_FILTERS = frozenset(('min_fare', 'max_fare', 'min_distance', 'max_distance'))
+
+# trips columns in dollars/miles/mph, for SELECT * FROM trips
+TRIP_SELECT = trip_columns()
+
+# WHERE clause per set of filter keys - built once per shape, and the
+# fixed text keeps each shape's statement prepared in the sqlite3 cache
+_WHERE_CACHE = {}
 
 class Trip:
     """Model for trip records"""
     
     def __init__(self, db_path=None):
-        self.db_path = db_path or os.getenv('DB_PATH', 'database/nyc_taxi.db')
+        self.db_path = db_path or DB_PATH
     
     def get_connection(self):
         """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # return rows as dicts
-        return conn
+        # per-thread shared connection - not closed after each query
+        return get_conn(self.db_path)
     
     def get_by_id(self, trip_id):
         """Get single trip by ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT t.*, 
+        cursor.execute(f"""
+            SELECT {trip_columns('t')}, 
                    pu_zone.zone as pickup_zone,
                    pu_zone.borough as pickup_borough,
                    do_zone.zone as dropoff_zone,
@@ -39,37 +60,66 @@ class Trip:
         """, (trip_id,))
         
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return dict(row)
         return None
     
-    def get_all(self, limit=100, offset=0):
-        """Get all trips with pagination"""
+    def get_all(self, limit=100, after=None):
+        """
+        Get all trips, newest first
+        Returns (column names, rows), rows as tuples
+        
+        after: (pickup_datetime, trip_id) of the last trip on the previous
+        page (keyset pagination). Seeking past it on the pickup_datetime index replaces OFFSET,
+        which had to walk and discard every earlier row
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT * FROM trips
-            ORDER BY pickup_datetime DESC
-            LIMIT ? OFFSET ?
-        """, (limit, offset))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        if after:
+            return fetch_columns(cursor, f"""
+                SELECT {TRIP_SELECT} FROM trips
+                WHERE (pickup_datetime, trip_id) < (?, ?)
+                ORDER BY pickup_datetime DESC, trip_id DESC
+                LIMIT ?
+            """, (*after, limit))
+        return fetch_columns(cursor, f"""
+            SELECT {TRIP_SELECT} FROM trips
+            ORDER BY pickup_datetime DESC, trip_id DESC
+            LIMIT ?
+        """, (limit,))
+    
+    @staticmethod
+    def _filter_clause(filters):
+        """
+        WHERE clause and params for a filters dict (see filter_trips)
+        Shared by filter_trips and count so a page and its total always
+        apply the same filters
+        """
+        shape = frozenset(filters)
+        where = _WHERE_CACHE.get(shape)
+        if where is None:
+            where = _WHERE_CACHE[shape] = "1=1" + "".join(
+                f" AND {predicate}" for key, predicate in FILTER_PREDICATES if key in shape)
+        
+        params = [to_hundredths(filters[key]) if key in SCALED_FILTERS else filters[key]
+                  for key, _ in FILTER_PREDICATES if key in shape]
+        return where, params
     
-    def filter_trips(self, filters=None, limit=100):
+    def filter_trips(self, filters=None, limit=100, after=None):
         """
-        Filter trips based on criteria
+        Filter trips based on criteria, newest first
+        Returns (column names, rows), rows as tuples
         
         filters can include:
         - start_date, end_date
         - min_fare, max_fare
         - min_distance, max_distance
         - pickup_location_id, dropoff_location_id
+        
+        after: (pickup_datetime, trip_id) of the last trip on the previous
+        page, see get_all
         """
         if filters is None:
             filters = {}
@@ -77,66 +127,30 @@ class Trip:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        # build query dynamically
-        query = "SELECT * FROM trips WHERE 1=1"
-        params = []
-        
-        if 'start_date' in filters:
-            query += " AND pickup_datetime >= ?"
-            params.append(filters['start_date'])
+        where, params = self._filter_clause(filters)
+        query = f"SELECT {TRIP_SELECT} FROM trips WHERE " + where
         
-        if 'end_date' in filters:
-            query += " AND pickup_datetime <= ?"
-            params.append(filters['end_date'])
+        if after:
+            query += " AND (pickup_datetime, trip_id) < (?, ?)"
+            params.extend(after)
         
-        if 'min_fare' in filters:
-            query += " AND fare_amount >= ?"
-            params.append(filters['min_fare'])
-        
-        if 'max_fare' in filters:
-            query += " AND fare_amount <= ?"
-            params.append(filters['max_fare'])
-        
-        if 'min_distance' in filters:
-            query += " AND trip_distance >= ?"
-            params.append(filters['min_distance'])
-        
-        if 'max_distance' in filters:
-            query += " AND trip_distance <= ?"
-            params.append(filters['max_distance'])
-        
-        if 'pickup_location_id' in filters:
-            query += " AND pickup_location_id = ?"
-            params.append(filters['pickup_location_id'])
-        
-        if 'dropoff_location_id' in filters:
-            query += " AND dropoff_location_id = ?"
-            params.append(filters['dropoff_location_id'])
-        
-        query += " ORDER BY pickup_datetime DESC LIMIT ?"
+        query += " ORDER BY pickup_datetime DESC, trip_id DESC LIMIT ?"
         params.append(limit)
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        return fetch_columns(cursor, query, params)
     
     def get_by_hour(self, hour):
         """Get trips by hour of day"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT * FROM trips
+        cursor.execute(f"""
+            SELECT {TRIP_SELECT} FROM trips
             WHERE pickup_hour = ?
             LIMIT 1000
         """, (hour,))
         
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        return fetch_dicts(cursor)
     
     def get_by_zone(self, zone_id, location_type='pickup'):
         """
@@ -147,38 +161,42 @@ class Trip:
         cursor = conn.cursor()
         
         if location_type == 'pickup':
-            query = "SELECT * FROM trips WHERE pickup_location_id = ? LIMIT 1000"
+            query = f"SELECT {TRIP_SELECT} FROM trips WHERE pickup_location_id = ? LIMIT 1000"
         else:
-            query = "SELECT * FROM trips WHERE dropoff_location_id = ? LIMIT 1000"
+            query = f"SELECT {TRIP_SELECT} FROM trips WHERE dropoff_location_id = ? LIMIT 1000"
         
         cursor.execute(query, (zone_id,))
-        rows = cursor.fetchall()
-        conn.close()
         
-        return [dict(row) for row in rows]
+        return fetch_dicts(cursor)
     
     def count(self, filters=None):
-        """Count trips with optional filters"""
+        """
+        Count trips with optional filters (same keys as filter_trips)
+        
+        Kept as its own (cached) query rather than a COUNT(*) OVER() on
+        the page query - the window has to read every matching row
+        before LIMIT applies, so the page could no longer stop early
+        on the pickup_datetime index
+        """
         if filters is None:
             filters = {}
         
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        query = "SELECT COUNT(*) as count FROM trips WHERE 1=1"
-        params = []
-        
-        if 'start_date' in filters:
-            query += " AND pickup_datetime >= ?"
-            params.append(filters['start_date'])
-        
-        if 'end_date' in filters:
-            query += " AND pickup_datetime <= ?"
-            params.append(filters['end_date'])
-        
-        cursor.execute(query, params)
+        if not filters:
+            # unfiltered total is stored at ingest (script/build_aggregates.py)
+            try:
+                cursor.execute("SELECT value FROM meta WHERE key = 'trip_count'")
+                result = cursor.fetchone()
+            except sqlite3.OperationalError:
+                result = None  # meta table not built yet
+            if result:
+                return result['value']
+        
+        where, params = self._filter_clause(filters)
+        cursor.execute("SELECT COUNT(*) as count FROM trips WHERE " + where, params)
         result = cursor.fetchone()
-        conn.close()
         
         return result['count'] if result else 0
     
@@ -195,7 +213,6 @@ class Trip:
         """)
         
         result = cursor.fetchone()
-        conn.close()
         
         if result:
             return {
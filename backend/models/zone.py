@@ -2,45 +2,81 @@
 Zone model - handles zone/location data
 """
 
-import sqlite3
-import os
-from dotenv import load_dotenv
+import re
+import threading
+from types import MappingProxyType
 
-load_dotenv()
+from config import DB_PATH
+from db import get_conn, has_table
+
+# search terms - the same word characters the unicode61 tokenizer keeps
+SEARCH_TERM = re.compile(r'[^\W_]+')
+
+# zones never change after seeding, so each database's ~265 zones are
+# read once and memoized here by db_path (cache.flush_caches empties it
+# through clear_zone_cache). Only tuples and read-only mappings are
+# kept - callers get fresh dicts, so nothing they do can change it
+_zones_memo = {}
+_zones_lock = threading.Lock()
+
+
+def _zones(db_path):
+    """(columns, rows ordered by borough and zone, {location_id: row}, {location_id: (zone, borough)})"""
+    zones = _zones_memo.get(db_path)
+    if zones is None:
+        with _zones_lock:
+            zones = _zones_memo.get(db_path)
+            if zones is None:
+                cursor = get_conn(db_path).cursor()
+                cursor.execute("SELECT * FROM zones ORDER BY borough, zone")
+                columns = tuple(d[0] for d in cursor.description)
+                rows = tuple(tuple(row) for row in cursor.fetchall())
+                
+                by_id = {}
+                names = {}
+                for row in rows:
+                    zone = dict(zip(columns, row))
+                    by_id[zone['location_id']] = row
+                    names[zone['location_id']] = (zone['zone'], zone['borough'])
+                
+                zones = _zones_memo[db_path] = (columns, rows, MappingProxyType(by_id),
+                                                MappingProxyType(names))
+    return zones
+
+
+def zone_names(db_path):
+    """Read-only {location_id: (zone, borough)} for every zone in db_path"""
+    return _zones(db_path)[3]
+
+
+def clear_zone_cache():
+    """Forget the memoized zones (after a reseed)"""
+    with _zones_lock:
+        _zones_memo.clear()
 
 class Zone:
     """Model for taxi zones"""
     
     def __init__(self, db_path=None):
-        self.db_path = db_path or os.getenv('DB_PATH', 'database/nyc_taxi.db')
+        self.db_path = db_path or DB_PATH
     
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        # per-thread shared connection - not closed after each query
+        return get_conn(self.db_path)
     
+    # these two are served from the memoized zones (see _zones)
     def get_all(self):
         """Get all zones"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM zones ORDER BY borough, zone")
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        columns, rows, _, _ = _zones(self.db_path)
+        return [dict(zip(columns, row)) for row in rows]
     
     def get_by_id(self, location_id):
         """Get zone by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM zones WHERE location_id = ?", (location_id,))
-        row = cursor.fetchone()
-        conn.close()
+        columns, _, by_id, _ = _zones(self.db_path)
+        row = by_id.get(location_id)
         
         if row:
-            return dict(row)
+            return dict(zip(columns, row))
         return None
     
     def get_by_borough(self, borough):
@@ -55,7 +91,6 @@ class Zone:
         """, (borough,))
         
         rows = cursor.fetchall()
-        conn.close()
         
         return [dict(row) for row in rows]
     
@@ -66,26 +101,89 @@ class Zone:
         
         cursor.execute("SELECT DISTINCT borough FROM zones ORDER BY borough")
         rows = cursor.fetchall()
-        conn.close()
         
         return [row['borough'] for row in rows]
     
     def search(self, query):
-        """Search zones by name"""
+        """
+        Search zones by name
+        Every word in query must start a word of the zone or borough name;
+        if none do, any zone or borough containing query matches
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        # full-text index (zones_fts) when present - each term is quoted
+        # so user input can't inject FTS operators, * makes it a prefix
+        terms = SEARCH_TERM.findall(query)
+        if terms and has_table(cursor, 'zones_fts'):
+            cursor.execute("""
+                SELECT z.* FROM zones_fts
+                JOIN zones z ON z.location_id = zones_fts.rowid
+                WHERE zones_fts MATCH ?
+                ORDER BY z.zone
+            """, (' '.join(f'"{term}"*' for term in terms),))
+            rows = cursor.fetchall()
+            if rows:
+                return [dict(row) for row in rows]
+        
+        # LIKE search (mid-word text, punctuation) - the wildcards are
+        # escaped so input like '5%' is matched literally. Zone names
+        # starting with query come first, found on idx_zones_name_nocase;
+        # then every other zone or borough containing it
+        pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
         cursor.execute("""
             SELECT * FROM zones 
-            WHERE zone LIKE ? OR borough LIKE ?
+            WHERE zone LIKE ? ESCAPE '\\'
             ORDER BY zone
-        """, (f'%{query}%', f'%{query}%'))
-        
+        """, (f'{pattern}%',))
         rows = cursor.fetchall()
-        conn.close()
+        
+        cursor.execute("""
+            SELECT * FROM zones 
+            WHERE (zone LIKE ? ESCAPE '\\' OR borough LIKE ? ESCAPE '\\')
+              AND NOT zone LIKE ? ESCAPE '\\'
+            ORDER BY zone
+        """, (f'%{pattern}%', f'%{pattern}%', f'{pattern}%'))
+        rows += cursor.fetchall()
         
         return [dict(row) for row in rows]
     
+    # pickup and dropoff stats in one statement - each side is a
+    # single search on its location index
+    ZONE_STATS_SQL = """
+        SELECT 
+            p.pickup_count,
+            d.dropoff_count,
+            p.avg_fare,
+            p.avg_distance,
+            p.avg_duration
+        FROM (
+            SELECT 
+                COUNT(*) as pickup_count,
+                AVG(fare_amount) / 100.0 as avg_fare,
+                AVG(trip_distance) / 100.0 as avg_distance,
+                AVG(trip_duration_min) as avg_duration
+            FROM trips
+            WHERE pickup_location_id = ?
+        ) p, (
+            SELECT COUNT(*) as dropoff_count
+            FROM trips
+            WHERE dropoff_location_id = ?
+        ) d
+    """
+    
+    @staticmethod
+    def _format_stats(location_id, stats):
+        return {
+            'location_id': location_id,
+            'pickup_count': stats['pickup_count'],
+            'dropoff_count': stats['dropoff_count'],
+            'avg_fare': round(stats['avg_fare'], 2) if stats['avg_fare'] else 0,
+            'avg_distance': round(stats['avg_distance'], 2) if stats['avg_distance'] else 0,
+            'avg_duration': round(stats['avg_duration'], 1) if stats['avg_duration'] else 0
+        }
+    
     def get_zone_stats(self, location_id):
         """
         Get statistics for a specific zone
@@ -94,39 +192,30 @@ class Zone:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        # pickup stats
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as pickup_count,
-                AVG(fare_amount) as avg_fare,
-                AVG(trip_distance) as avg_distance,
-                AVG(trip_duration_min) as avg_duration
-            FROM trips
-            WHERE pickup_location_id = ?
-        """, (location_id,))
-        
-        pickup_stats = dict(cursor.fetchone())
+        cursor.execute(self.ZONE_STATS_SQL, (location_id, location_id))
         
-        # dropoff stats
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as dropoff_count
-            FROM trips
-            WHERE dropoff_location_id = ?
-        """, (location_id,))
+        return self._format_stats(location_id, cursor.fetchone())
+    
+    def get_with_stats(self, location_id):
+        """
+        Get a zone and its statistics (see get_zone_stats) in one query
+        Returns None if the zone doesn't exist
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
-        dropoff_stats = dict(cursor.fetchone())
+        cursor.execute(f"""
+            SELECT z.*, s.*
+            FROM zones z, ({self.ZONE_STATS_SQL}) s
+            WHERE z.location_id = ?
+        """, (location_id, location_id, location_id))
         
-        conn.close()
+        row = cursor.fetchone()
+        if row is None:
+            return None
         
-        return {
-            'location_id': location_id,
-            'pickup_count': pickup_stats['pickup_count'],
-            'dropoff_count': dropoff_stats['dropoff_count'],
-            'avg_fare': round(pickup_stats['avg_fare'], 2) if pickup_stats['avg_fare'] else 0,
-            'avg_distance': round(pickup_stats['avg_distance'], 2) if pickup_stats['avg_distance'] else 0,
-            'avg_duration': round(pickup_stats['avg_duration'], 1) if pickup_stats['avg_duration'] else 0
-        }
+        zone = {key: row[key] for key in ('location_id', 'borough', 'zone', 'service_zone')}
+        return {**zone, **self._format_stats(location_id, row)}
     
     def get_popular_zones(self, limit=10, by='pickup'):
         """
@@ -135,7 +224,19 @@ class Zone:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        if by == 'pickup':
+        # read the precomputed counts (aggregates.sql) when present
+        if has_table(cursor, 'zone_pickup_counts'):
+            counts = 'zone_pickup_counts' if by == 'pickup' else 'zone_dropoff_counts'
+            query = f"""
+                SELECT 
+                    z.*,
+                    COALESCE(c.trip_count, 0) as trip_count
+                FROM zones z
+                LEFT JOIN {counts} c ON c.location_id = z.location_id
+                ORDER BY trip_count DESC
+                LIMIT ?
+            """
+        elif by == 'pickup':
             query = """
                 SELECT 
                     z.*,
@@ -160,6 +261,5 @@ class Zone:
         
         cursor.execute(query, (limit,))
         rows = cursor.fetchall()
-        conn.close()
         
         return [dict(row) for row in rows]
\ No newline at end of file
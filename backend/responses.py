@@ -0,0 +1,28 @@
+"""
+JSON responses encoded with orjson
+
+Routes return ojson(...) instead of jsonify(...): orjson writes the
+body straight to bytes, and numpy values and namedtuple records in
+results are encoded without a Python-level conversion pass
+"""
+
+import orjson
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def json_default(o):
+    """Encode types orjson doesn't know natively"""
+    # namedtuple records (anomaly results) become JSON objects here
+    if hasattr(o, '_asdict'):
+        return o._asdict()
+    # anything else gets Flask's handling (Decimal, __html__, ...)
+    return DefaultJSONProvider.default(o)
+
+
+def ojson(obj, status=200):
+    """JSON response for obj with the given status code"""
+    return Response(orjson.dumps(obj, default=json_default, option=JSON_OPTIONS),
+                    status=status, mimetype='application/json')
@@ -2,9 +2,12 @@
 Insights Routes - Handle analytics and insights endpoints
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, request
 from services.analytics_service import AnalyticsService
 from services.query_service import QueryService
+from models.zone import clear_zone_cache
+from cache import cached_call, cached_json, flush_caches, on_flush, snapshot, warm
+from responses import ojson
 
 insights_bp = Blueprint('insights', __name__, url_prefix='/api')
 
@@ -12,34 +15,44 @@ insights_bp = Blueprint('insights', __name__, url_prefix='/api')
 analytics_service = AnalyticsService()
 query_service = QueryService()
 
+DEFAULT_ANOMALY_SAMPLE = 10000
+
+# multi-second scans - the warmer (cache.start_warmer) keeps these
+# precomputed so the routes below only return the latest snapshot
+warm('insights', analytics_service.get_insights)
+warm('anomalies', analytics_service.detect_anomalies, DEFAULT_ANOMALY_SAMPLE)
+warm('borough_comparison', analytics_service.compare_boroughs)
+
+# memoized zone lookups - dropped along with the cached results
+on_flush(clear_zone_cache)
+
 # Basic Stats 
 
 @insights_bp.route('/stats', methods=['GET'])
 def get_stats():
     """Get overall statistics"""
     try:
-        stats = query_service.get_basic_stats()
-        return jsonify(stats)
+        stats = cached_call('basic_stats', query_service.get_basic_stats)
+        return ojson(stats)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @insights_bp.route('/stats/hourly', methods=['GET'])
 def get_hourly_stats():
     """Get trip distribution by hour"""
     try:
-        data = query_service.get_hourly_distribution()
-        return jsonify(data)
+        return cached_json('hourly_distribution', query_service.get_hourly_distribution)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @insights_bp.route('/stats/borough', methods=['GET'])
 def get_borough_stats():
     """Get stats by borough"""
     try:
-        data = query_service.get_trips_by_borough()
-        return jsonify(data)
+        data = cached_call('trips_by_borough', query_service.get_trips_by_borough)
+        return ojson(data)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 #  Analytics (Custom Algorithms) 
 
@@ -50,66 +63,69 @@ def analyze_top_zones():
         k = request.args.get('k', default=10, type=int)
         metric = request.args.get('metric', default='pickups', type=str)
         
-        results = analytics_service.analyze_top_zones(k, metric)
-        return jsonify(results)
+        return cached_json('top_zones', analytics_service.analyze_top_zones, k, metric)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @insights_bp.route('/analytics/top-routes', methods=['GET'])
 def analyze_top_routes():
     """Get top routes using custom algorithm"""
     try:
         k = request.args.get('k', default=10, type=int)
-        results = analytics_service.analyze_top_routes(k)
-        return jsonify(results)
+        results = cached_call('top_routes', analytics_service.analyze_top_routes, k)
+        return ojson(results)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @insights_bp.route('/analytics/anomalies', methods=['GET'])
 def detect_anomalies():
     """Detect anomalies using custom detector"""
     try:
-        sample_size = request.args.get('sample', default=10000, type=int)
-        results = analytics_service.detect_anomalies(sample_size)
-        return jsonify(results)
+        sample_size = request.args.get('sample', default=DEFAULT_ANOMALY_SAMPLE, type=int)
+        results = None
+        if sample_size == DEFAULT_ANOMALY_SAMPLE:
+            results = snapshot('anomalies')
+        if results is None:
+            results = cached_call('anomalies', analytics_service.detect_anomalies, sample_size)
+        return ojson(results)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @insights_bp.route('/analytics/speed-patterns', methods=['GET'])
 def get_speed_patterns():
     """Get speed patterns by hour"""
     try:
-        data = analytics_service.analyze_speed_patterns()
-        return jsonify(data)
+        data = cached_call('speed_patterns', analytics_service.analyze_speed_patterns)
+        return ojson(data)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @insights_bp.route('/analytics/revenue-hourly', methods=['GET'])
 def get_revenue_by_hour():
     """Get revenue analysis by hour"""
     try:
-        data = analytics_service.analyze_revenue_by_hour()
-        return jsonify(data)
+        data = cached_call('revenue_by_hour', analytics_service.analyze_revenue_by_hour)
+        return ojson(data)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @insights_bp.route('/analytics/borough-comparison', methods=['GET'])
 def compare_boroughs():
     """Compare all boroughs"""
     try:
-        data = analytics_service.compare_boroughs()
-        return jsonify(data)
+        data = snapshot('borough_comparison') or cached_call('borough_comparison', analytics_service.compare_boroughs)
+        return ojson(data)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @insights_bp.route('/analytics/insights', methods=['GET'])
 def get_insights():
     """Get key insights using all analytics"""
     try:
-        insights = analytics_service.get_insights()
-        return jsonify(insights)
+        insights = snapshot('insights') or cached_call('insights', analytics_service.get_insights)
+        return ojson(insights)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 #  Routes 
 
@@ -118,10 +134,10 @@ def get_popular_routes():
     """Get most popular routes"""
     try:
         limit = request.args.get('limit', default=10, type=int)
-        routes = query_service.get_popular_routes(limit)
-        return jsonify(routes)
+        routes = cached_call('popular_routes', query_service.get_popular_routes, limit)
+        return ojson(routes)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 #  Search 
 
@@ -131,9 +147,20 @@ def search_trips():
     try:
         filters = request.json
         results = query_service.search_trips(filters)
-        return jsonify(results)
+        return ojson(results)
+    except Exception as e:
+        return ojson({'error': str(e)}, 500)
+
+# Cache admin
+
+@insights_bp.route('/cache/flush', methods=['POST'])
+def flush_cache():
+    """Clear all cached results (the data is static between seeds)"""
+    try:
+        flush_caches()
+        return ojson({'status': 'flushed'})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 #  Health Check
 
@@ -143,13 +170,13 @@ def health_check():
     try:
         stats = query_service.get_basic_stats()
         
-        return jsonify({
+        return ojson({
             'status': 'healthy',
             'database': 'connected',
             'total_trips': stats['total_trips']
         })
     except Exception as e:
-        return jsonify({
+        return ojson({
             'status': 'unhealthy',
             'error': str(e)
-        }), 500
+        }, 500)
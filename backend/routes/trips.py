@@ -2,49 +2,83 @@
 Trip Routes - Handle trip-related endpoints
 """
 
-from flask import Blueprint, jsonify, request
+import base64
+import binascii
+import orjson
+from flask import Blueprint, request
+from config import Config
 from models.trip import Trip
+from cache import cached_count
+from responses import ojson
 
 trips_bp = Blueprint('trips', __name__, url_prefix='/api/trips')
 
 # Initialize model
 trip_model = Trip()
 
+# (query arg, filter key, type) accepted by GET /api/trips
+TRIP_FILTERS = (
+    ('start_date', 'start_date', str),
+    ('end_date', 'end_date', str),
+    ('min_fare', 'min_fare', float),
+    ('max_fare', 'max_fare', float),
+    ('pickup_zone', 'pickup_location_id', int),
+)
+
+def encode_cursor(pickup_datetime, trip_id):
+    """Opaque next-page token for the last trip on a page"""
+    raw = orjson.dumps([pickup_datetime, trip_id])
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(token):
+    """(pickup_datetime, trip_id) from a token made by encode_cursor"""
+    pickup_datetime, trip_id = orjson.loads(base64.urlsafe_b64decode(token))
+    return str(pickup_datetime), int(trip_id)
+
 @trips_bp.route('', methods=['GET'])
 def get_trips():
     """Get trips with pagination and filters"""
     try:
-        # pagination
-        page = request.args.get('page', default=1, type=int)
-        per_page = request.args.get('per_page', default=50, type=int)
+        args = request.args
+        
+        # pagination - page numbers are gone, only the first page has no cursor
+        if args.get('page', default=1, type=int) != 1:
+            return ojson({'error': 'page is not supported - pass the previous next_cursor as cursor'}, 400)
+        per_page = args.get('per_page', default=Config.DEFAULT_PAGE_SIZE, type=int)
+        per_page = min(max(per_page, 1), Config.MAX_PAGE_SIZE)
+        
+        # keyset pagination - cursor is the next_cursor of the previous page
+        after = None
+        if args.get('cursor'):
+            try:
+                after = decode_cursor(args.get('cursor'))
+            except (binascii.Error, ValueError, TypeError):
+                return ojson({'error': 'Invalid cursor'}, 400)
+        
+        # filters - empty values are ignored
+        filters = {key: cast(v) for arg, key, cast in TRIP_FILTERS if (v := args.get(arg))}
         
-        # filters
-        filters = {}
-        if request.args.get('start_date'):
-            filters['start_date'] = request.args.get('start_date')
-        if request.args.get('end_date'):
-            filters['end_date'] = request.args.get('end_date')
-        if request.args.get('min_fare'):
-            filters['min_fare'] = float(request.args.get('min_fare'))
-        if request.args.get('max_fare'):
-            filters['max_fare'] = float(request.args.get('max_fare'))
-        if request.args.get('pickup_zone'):
-            filters['pickup_location_id'] = int(request.args.get('pickup_zone'))
+        # trips go out as one column list + an array per trip,
+        # no per-row dicts (or repeated keys in the JSON)
+        columns, rows = trip_model.filter_trips(filters, limit=per_page, after=after)
+        total = cached_count(trip_model.count, filters)
         
-        trips = trip_model.filter_trips(filters, limit=per_page)
-        total = trip_model.count(filters)
+        next_cursor = None
+        if len(rows) == per_page:
+            last = dict(zip(columns, rows[-1]))
+            next_cursor = encode_cursor(last['pickup_datetime'], last['trip_id'])
         
-        return jsonify({
-            'trips': trips,
+        return ojson({
+            'columns': columns,
+            'rows': rows,
             'pagination': {
-                'page': page,
                 'per_page': per_page,
                 'total': total,
-                'pages': (total + per_page - 1) // per_page
+                'next_cursor': next_cursor
             }
         })
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @trips_bp.route('/<int:trip_id>', methods=['GET'])
 def get_trip(trip_id):
@@ -52,7 +86,7 @@ def get_trip(trip_id):
     try:
         trip = trip_model.get_by_id(trip_id)
         if not trip:
-            return jsonify({'error': 'Trip not found'}), 404
-        return jsonify(trip)
+            return ojson({'error': 'Trip not found'}, 404)
+        return ojson(trip)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
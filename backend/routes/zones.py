@@ -2,9 +2,11 @@
 Zone Routes - Handle zone-related endpoints
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, request
 from models.zone import Zone
 from services.query_service import QueryService
+from cache import cached_json
+from responses import ojson
 
 zones_bp = Blueprint('zones', __name__, url_prefix='/api/zones')
 
@@ -17,32 +19,29 @@ def get_zones():
     """Get all zones"""
     try:
         zones = zone_model.get_all()
-        return jsonify(zones)
+        return ojson(zones)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @zones_bp.route('/<int:zone_id>', methods=['GET'])
 def get_zone(zone_id):
     """Get specific zone with stats"""
     try:
-        zone = zone_model.get_by_id(zone_id)
+        zone = zone_model.get_with_stats(zone_id)
         if not zone:
-            return jsonify({'error': 'Zone not found'}), 404
-        
-        stats = zone_model.get_zone_stats(zone_id)
-        return jsonify({**zone, **stats})
+            return ojson({'error': 'Zone not found'}, 404)
+        return ojson(zone)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @zones_bp.route('/top-pickups', methods=['GET'])
 def get_top_pickup_zones():
     """Get top pickup zones"""
     try:
         limit = request.args.get('limit', default=10, type=int)
-        zones = query_service.get_top_pickup_zones(limit)
-        return jsonify(zones)
+        return cached_json('top_pickup_zones', query_service.get_top_pickup_zones, limit)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @zones_bp.route('/top-dropoffs', methods=['GET'])
 def get_top_dropoff_zones():
@@ -50,6 +49,6 @@ def get_top_dropoff_zones():
     try:
         limit = request.args.get('limit', default=10, type=int)
         zones = query_service.get_top_dropoff_zones(limit)
-        return jsonify(zones)
+        return ojson(zones)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
@@ -0,0 +1,44 @@
+import sqlite3
+import os
+from datetime import datetime
+
+# Rebuilds the precomputed aggregate tables (database/aggregates.sql).
+# seed.py already does this at the end of a load - run this after any
+# other change to the trips table.
+AGGREGATE_TABLES = ('zone_pickup_counts', 'zone_dropoff_counts', 'route_counts',
+                    'hourly_stats', 'borough_stats')
+
+def build_aggregates(db_path, aggregates_path):
+    """
+    (Re)build the aggregate tables from trips
+    """
+    print("Building aggregate tables...")
+    start_time = datetime.now()
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    with open(aggregates_path, 'r') as f:
+        cursor.executescript(f.read())
+
+    for table in AGGREGATE_TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        print(f"  {table}: {cursor.fetchone()[0]:,} rows")
+
+    cursor.execute("SELECT value FROM meta WHERE key = 'trip_count'")
+    print(f"  meta.trip_count: {cursor.fetchone()[0]:,}")
+
+    conn.close()
+
+    duration = (datetime.now() - start_time).total_seconds()
+    print(f"Aggregates built in {duration:.2f} seconds")
+
+if __name__ == '__main__':
+    # Get the script directory and construct paths relative to project root
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(script_dir))
+
+    db_path = os.getenv('DB_PATH', os.path.join(project_root, 'database', 'nyc_taxi.db'))
+    aggregates_path = os.path.join(project_root, 'database', 'aggregates.sql')
+
+    build_aggregates(db_path, aggregates_path)
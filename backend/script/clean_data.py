@@ -1,68 +1,144 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pvcsv
+import pyarrow.parquet as pq
 import datetime
 import os
 
-def process_nyc_taxi_data(csv_path, lookup_path, output_path, log_path):
-    #  DATA INTEGRATION
-    print("Loading data...")
-    # Read the CSV file and the lookup CSV
-    df = pd.read_csv(csv_path)
-    lookup = pd.read_csv(lookup_path)
-    
-    initial_count = len(df)
-    log_entries = []
+# Only these columns are read. Types are fixed up front so every streamed
+# block gets the same schema, and the timestamps are parsed while reading
+# (multi-threaded, in Arrow) instead of a pd.to_datetime pass afterwards
+CSV_COLUMN_TYPES = {
+    'tpep_pickup_datetime': pa.timestamp('s'),
+    'tpep_dropoff_datetime': pa.timestamp('s'),
+    'passenger_count': pa.float64(),
+    'trip_distance': pa.float64(),
+    'PULocationID': pa.int64(),
+    'DOLocationID': pa.int64(),
+    'fare_amount': pa.float64(),
+    'tip_amount': pa.float64(),
+    'total_amount': pa.float64(),
+}
 
-    # DATA INTEGRITY (The Cleaning part) 
-    #  Remove impossible timestamps 
-    df['tpep_pickup_datetime'] = pd.to_datetime(df['tpep_pickup_datetime'])
-    df['tpep_dropoff_datetime'] = pd.to_datetime(df['tpep_dropoff_datetime'])
-    
-    mask_time = df['tpep_dropoff_datetime'] > df['tpep_pickup_datetime']
-    time_anomalies = initial_count - mask_time.sum()
-    df = df[mask_time]
-    log_entries.append(f"Removed {time_anomalies} records with invalid timestamps (Dropoff <= Pickup).")
+# CSV bytes per streamed block (~500k trips) - memory stays bounded by
+# the block size, not the size of the monthly file
+CSV_BLOCK_SIZE = 64 << 20
 
-    # Remove zero or negative distances
-    mask_dist = df['trip_distance'] > 0
-    dist_anomalies = len(df) - mask_dist.sum()
-    df = df[mask_dist]
-    log_entries.append(f"Removed {dist_anomalies} records with zero or negative distance.")
+# numba is optional - without it the speed feature is computed with numpy
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
 
-    #  Remove fare outliers (Minimum NYC fare is $2.50)
-    mask_fare = df['fare_amount'] >= 2.50
-    fare_anomalies = len(df) - mask_fare.sum()
-    df = df[mask_fare]
-    log_entries.append(f"Removed {fare_anomalies} records with fare < $2.50.")
+if HAVE_NUMBA:
+    @njit(cache=True, parallel=True)
+    def _speed(dist, dur_min, out):
+        # one pass, no temporaries - a zero/invalid duration gives 0 mph
+        for i in prange(dist.size):
+            d = dur_min[i]
+            out[i] = dist[i] / (d / 60.0) if d > 0 else 0.0
+else:
+    def _speed(dist, dur_min, out):
+        out[:] = 0.0
+        np.divide(dist, dur_min / 60.0, out=out, where=dur_min > 0)
 
-    #  FEATURE ENGINEERING (The 3 Derived Features) 
-    print("Engineering features...")
+def compute_speed_mph(dist, dur_min):
+    """Average speed in mph; 0 where the duration isn't positive"""
+    out = np.empty(dist.size)
+    _speed(dist, dur_min, out)
+    return out
+
+def clean_chunk(df):
+    """
+    Filter one chunk of raw trips and add the derived features
+    Returns (cleaned frame, (time, distance, fare) anomaly counts)
+    """
+    # DATA INTEGRITY (The Cleaning part) 
+    # Build every filter up front and slice once, instead of copying
+    # the frame after each filter
+    mask_time = df['tpep_dropoff_datetime'] > df['tpep_pickup_datetime']  # impossible timestamps
+    mask_dist = df['trip_distance'] > 0  # zero or negative distances
+    mask_fare = df['fare_amount'] >= 2.50  # fare outliers (minimum NYC fare is $2.50)
+    
+    # each count is over the rows the earlier filters kept
+    anomalies = (
+        int((~mask_time).sum()),
+        int((mask_time & ~mask_dist).sum()),
+        int((mask_time & mask_dist & ~mask_fare).sum()),
+    )
     
+    df = df.loc[mask_time & mask_dist & mask_fare].copy()
+
+    #  FEATURE ENGINEERING (The 3 Derived Features) 
     # Feature 1:  (How long was the ride in minutes?)
     df['trip_duration_min'] = (df['tpep_dropoff_datetime'] - df['tpep_pickup_datetime']).dt.total_seconds() / 60
     
     # Feature 2:  (How fast was the taxi moving in MPH?)
-    df['avg_speed_mph'] = df['trip_distance'] / (df['trip_duration_min'] / 60)
-    # Handle any math errors (like dividing by 0 duration)
-    df['avg_speed_mph'] = df['avg_speed_mph'].replace([float('inf')], 0).fillna(0)
+    # (a 0 duration would divide by zero - those rows get 0 mph)
+    df['avg_speed_mph'] = compute_speed_mph(
+        df['trip_distance'].to_numpy(dtype=np.float64), df['trip_duration_min'].to_numpy(dtype=np.float64))
 
     # Feature 3: Pickup Hour 
     df['pickup_hour'] = df['tpep_pickup_datetime'].dt.hour
     
-    #  NORMALIZATION & EXPORT 
+    #  NORMALIZATION
     # Only keep the columns we actually need for the database
     columns_to_keep = [
         'tpep_pickup_datetime', 'tpep_dropoff_datetime', 'passenger_count', 
         'trip_distance', 'PULocationID', 'DOLocationID', 'fare_amount', 
         'tip_amount', 'total_amount', 'trip_duration_min', 'avg_speed_mph', 'pickup_hour'
     ]
-    df_clean = df[columns_to_keep]
+    return df[columns_to_keep], anomalies
+
+def process_nyc_taxi_data(csv_path, lookup_path, output_path, log_path):
+    #  DATA INTEGRATION
+    print("Loading and cleaning data...")
+    # Stream the CSV file block by block and read the lookup CSV
+    reader = pvcsv.open_csv(
+        csv_path,
+        read_options=pvcsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pvcsv.ConvertOptions(column_types=CSV_COLUMN_TYPES,
+                                             include_columns=list(CSV_COLUMN_TYPES)))
+    lookup = pd.read_csv(lookup_path)
     
     # Ensure output directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     os.makedirs(os.path.dirname(log_path), exist_ok=True)
     
-    # Export the cleaned data for your database
-    df_clean.to_csv(output_path, index=False)
+    initial_count = 0
+    final_count = 0
+    time_anomalies = dist_anomalies = fare_anomalies = 0
+    
+    # Export the cleaned data for your database - Parquet keeps the column
+    # types and is a fraction of the CSV size (database/seed.py loads it).
+    # Each cleaned chunk is appended as it's produced
+    writer = None
+    try:
+        for batch in reader:
+            df_clean, (time_bad, dist_bad, fare_bad) = clean_chunk(batch.to_pandas(split_blocks=True))
+            
+            initial_count += batch.num_rows
+            final_count += len(df_clean)
+            time_anomalies += time_bad
+            dist_anomalies += dist_bad
+            fare_anomalies += fare_bad
+            
+            table = pa.Table.from_pandas(df_clean, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema, compression='zstd', use_dictionary=True)
+            writer.write_table(table)
+            print(f"Processed {initial_count:,} records...")
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    log_entries = [
+        f"Removed {time_anomalies} records with invalid timestamps (Dropoff <= Pickup).",
+        f"Removed {dist_anomalies} records with zero or negative distance.",
+        f"Removed {fare_anomalies} records with fare < $2.50.",
+    ]
     
     #  TRANSPARENCY LOG
     with open(log_path, 'w') as f:
@@ -71,8 +147,8 @@ def process_nyc_taxi_data(csv_path, lookup_path, output_path, log_path):
         f.write(f"Initial Records Received: {initial_count}\n")
         for entry in log_entries:
             f.write(f"- {entry}\n")
-        f.write(f"Final Records Exported: {len(df_clean)}\n")
-        f.write(f"Data Reduction: {((initial_count - len(df_clean))/initial_count)*100:.2f}%\n")
+        f.write(f"Final Records Exported: {final_count}\n")
+        f.write(f"Data Reduction: {((initial_count - final_count)/initial_count)*100:.2f}%\n")
     print(f"Success! Cleaned data saved to {output_path}")
 
 if __name__ == '__main__':
@@ -83,6 +159,6 @@ if __name__ == '__main__':
     process_nyc_taxi_data(
         csv_path=os.path.join(project_root, 'backend', 'data', 'raw', 'yellow_tripdata_2019-01.csv'),
         lookup_path=os.path.join(project_root, 'backend', 'data', 'raw', 'taxi_zone_lookup.csv'),
-        output_path=os.path.join(project_root, 'backend', 'data', 'processed', 'cleaned_trips.csv'),
+        output_path=os.path.join(project_root, 'backend', 'data', 'processed', 'cleaned_trips.parquet'),
         log_path=os.path.join(project_root, 'backend', 'data', 'logs', 'transparency_log.txt')
     )
\ No newline at end of file
@@ -2,133 +2,250 @@
 Analytics Service - advanced analytics using custom algorithms
 """
 
-import sqlite3
+import heapq
 import os
 import sys
-from dotenv import load_dotenv
+import numpy as np
 
 # add parent dir to path to import algorithms
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from algorithms.top_k_zones import TopKZones
+import duckdb_engine
 from algorithms.anomaly_detector import AnomalyDetector
+from config import Config, DB_PATH
+from db import get_conn, has_table
+from models.zone import zone_names
 
-load_dotenv()
+# ANALYTICS_ENGINE=duckdb runs the full scans of trips on DuckDB (see
+# duckdb_engine.py) when it's installed; lookups stay on SQLite either way
+USE_DUCKDB = Config.ANALYTICS_ENGINE == 'duckdb' and duckdb_engine.HAVE_DUCKDB
 
 class AnalyticsService:
     """Service for advanced analytics"""
     
     def __init__(self, db_path=None):
-        self.db_path = db_path or os.getenv('DB_PATH', 'database/nyc_taxi.db')
-        self.top_k_finder = TopKZones(k=10)
+        self.db_path = db_path or DB_PATH
         self.anomaly_detector = AnomalyDetector(z_threshold=3.0)
     
     def get_conn(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        # per-thread shared connection - not closed after each query
+        return get_conn(self.db_path)
+    
+    def _scan(self, cur, query, params=()):
+        """
+        Run an aggregation over the trips table and fetch its rows
+        
+        On DuckDB when it's enabled and can read the database, otherwise
+        on cur. Rows index by position or name either way
+        """
+        if USE_DUCKDB and duckdb_engine.available(self.db_path):
+            return duckdb_engine.fetchall(self.db_path, query, params)
+        cur.execute(query, params)
+        return cur.fetchall()
+    
+    # the ~265 zones never change after seeding - one memoized query
+    # (models.zone) instead of one query per ranked zone or route end
+    def _zone_lookup(self):
+        """Read-only {location_id: (zone, borough)} for every zone"""
+        return zone_names(self.db_path)
     
     def analyze_top_zones(self, k=10, metric='pickups'):
         """
-        Find top K zones using our custom algorithm
+        Find top K zones
         
         metric: 'pickups', 'dropoffs', or 'revenue'
+        
+        Ranking and the K cutoff happen in SQLite, so only K rows are
+        fetched. Reads the precomputed tables from
+        aggregates.sql when they exist, otherwise aggregates
+        the trips table directly
         """
         conn = self.get_conn()
         cur = conn.cursor()
-        
-        if metric == 'pickups':
+        rows = None
+        
+        if has_table(cur, 'zone_pickup_counts'):
+            if metric == 'pickups':
+                cur.execute("""
+                    SELECT location_id, trip_count FROM zone_pickup_counts
+                    ORDER BY trip_count DESC LIMIT ?
+                """, (k,))
+            elif metric == 'dropoffs':
+                cur.execute("""
+                    SELECT location_id, trip_count FROM zone_dropoff_counts
+                    ORDER BY trip_count DESC LIMIT ?
+                """, (k,))
+            else:  # revenue
+                cur.execute("""
+                    SELECT location_id, total_revenue FROM zone_pickup_counts
+                    ORDER BY total_revenue DESC LIMIT ?
+                """, (k,))
+        elif metric == 'pickups':
             # get pickup counts
-            cur.execute("""
+            rows = self._scan(cur, """
                 SELECT pickup_location_id, COUNT(*) as count
                 FROM trips
                 GROUP BY pickup_location_id
-            """)
+                ORDER BY count DESC, pickup_location_id
+                LIMIT ?
+            """, (k,))
         elif metric == 'dropoffs':
             # get dropoff counts
-            cur.execute("""
+            rows = self._scan(cur, """
                 SELECT dropoff_location_id, COUNT(*) as count
                 FROM trips
                 GROUP BY dropoff_location_id
-            """)
+                ORDER BY count DESC, dropoff_location_id
+                LIMIT ?
+            """, (k,))
         else:  # revenue
             # get revenue by pickup zone
-            cur.execute("""
-                SELECT pickup_location_id, SUM(fare_amount) as total_revenue
+            rows = self._scan(cur, """
+                SELECT pickup_location_id, SUM(fare_amount) / 100.0 as total_revenue
                 FROM trips
                 GROUP BY pickup_location_id
-            """)
-        
-        rows = cur.fetchall()
-        
-        # convert to dict for our algorithm
-        if metric == 'revenue':
-            zone_data = {row[0]: row[1] for row in rows}  # zone_id: revenue
-        else:
-            zone_data = {row[0]: row[1] for row in rows}  # zone_id: count
+                ORDER BY total_revenue DESC, pickup_location_id
+                LIMIT ?
+            """, (k,))
         
-        # use our custom top K algorithm
-        self.top_k_finder.k = k
-        if metric == 'revenue':
-            top_zones = self.top_k_finder.find_top_k_by_revenue(zone_data)
-        else:
-            top_zones = self.top_k_finder.find_top_k_pickups(zone_data)
+        if rows is None:
+            rows = cur.fetchall()
+        top_zones = [(row[0], row[1]) for row in rows]
         
+        return self._zone_results(top_zones, metric)
+    
+    def _zone_results(self, top_zones, metric):
+        """analyze_top_zones entries for ranked (location_id, value) pairs"""
         # get zone names
+        zones = self._zone_lookup()
         results = []
         for zone_id, value in top_zones:
-            cur.execute("SELECT * FROM zones WHERE location_id = ?", (zone_id,))
-            zone_info = dict(cur.fetchone())
+            zone, borough = zones[zone_id]
             results.append({
                 'location_id': zone_id,
-                'zone': zone_info['zone'],
-                'borough': zone_info['borough'],
+                'zone': zone,
+                'borough': borough,
                 'value': round(value, 2) if metric == 'revenue' else value,
                 'metric': metric
             })
         
-        conn.close()
         return results
     
-    def analyze_top_routes(self, k=10):
-        """Find top K routes using custom algorithm"""
+    def _pickup_zone_insights(self, k):
+        """
+        (analyze_top_zones(k, 'pickups'), analyze_top_zones(k, 'revenue'),
+        compare_boroughs()) for get_insights
+        
+        Without the aggregate tables all three come from one GROUP BY
+        pickup zone over trips: the rankings are taken from its ~265
+        rows, and the borough totals are those rows summed per borough,
+        instead of scanning trips once for each
+        """
         conn = self.get_conn()
         cur = conn.cursor()
         
-        # get all route counts
-        cur.execute("""
-            SELECT pickup_location_id, dropoff_location_id, COUNT(*) as count
+        # the precomputed tables answer each of these from a few rows
+        if has_table(cur, 'zone_pickup_counts') and has_table(cur, 'borough_stats'):
+            return (self.analyze_top_zones(k=k, metric='pickups'),
+                    self.analyze_top_zones(k=k, metric='revenue'),
+                    self.compare_boroughs())
+        
+        # sums with their non-NULL counts, so borough averages come out
+        # the same as AVG() over the trips
+        rows = self._scan(cur, """
+            SELECT 
+                pickup_location_id,
+                COUNT(*) as trip_count,
+                SUM(fare_amount) / 100.0 as total_revenue,
+                COUNT(fare_amount) as fare_count,
+                SUM(trip_distance) / 100.0 as distance_sum,
+                COUNT(trip_distance) as distance_count,
+                SUM(trip_duration_min) as duration_sum,
+                COUNT(trip_duration_min) as duration_count,
+                SUM(avg_speed_mph) / 100.0 as speed_sum,
+                COUNT(avg_speed_mph) as speed_count
             FROM trips
-            GROUP BY pickup_location_id, dropoff_location_id
+            GROUP BY pickup_location_id
+            ORDER BY pickup_location_id
         """)
         
-        rows = cur.fetchall()
+        # nsmallest keeps ties in location order, like the SQL rankings
+        by_pickups = heapq.nsmallest(k, rows, key=lambda row: -row[1])
+        by_revenue = heapq.nsmallest(k, rows, key=lambda row: -row[2])
+        
+        # roll the zones up to boroughs (the JOIN in compare_boroughs
+        # skips trips whose zone isn't in the lookup - so does this)
+        zones = self._zone_lookup()
+        boroughs = {}
+        for row in rows:
+            if row[0] not in zones:
+                continue
+            totals = boroughs.setdefault(zones[row[0]][1], [0] * 9)
+            for i, value in enumerate(row[1:]):
+                totals[i] += value or 0
+        
+        borough_rows = [{
+            'borough': borough,
+            'trip_count': count,
+            'avg_fare': revenue / fares if fares else None,
+            'avg_distance': distance / distances if distances else None,
+            'avg_duration': duration / durations if durations else None,
+            'avg_speed': speed / speeds if speeds else None,
+            'total_revenue': revenue if fares else None,
+        } for borough, (count, revenue, fares, distance, distances,
+                        duration, durations, speed, speeds) in boroughs.items()]
+        borough_rows.sort(key=lambda row: (-row['trip_count'], row['borough']))
+        
+        return (self._zone_results([(row[0], row[1]) for row in by_pickups], 'pickups'),
+                self._zone_results([(row[0], row[2]) for row in by_revenue], 'revenue'),
+                self._borough_results(borough_rows))
+    
+    def analyze_top_routes(self, k=10):
+        """
+        Find top K routes
+        
+        Ranked and cut to K in SQLite, like analyze_top_zones - reads
+        route_counts (aggregates.sql) when it exists instead of
+        grouping the trips table. Ties are ordered by route ids
+        """
+        conn = self.get_conn()
+        cur = conn.cursor()
         
-        # convert to dict
-        route_counts = {(row[0], row[1]): row[2] for row in rows}
+        if has_table(cur, 'route_counts'):
+            cur.execute("""
+                SELECT pickup_location_id, dropoff_location_id, trip_count
+                FROM route_counts
+                ORDER BY trip_count DESC, pickup_location_id, dropoff_location_id
+                LIMIT ?
+            """, (k,))
+            rows = cur.fetchall()
+        else:
+            rows = self._scan(cur, """
+                SELECT pickup_location_id, dropoff_location_id, COUNT(*) as count
+                FROM trips
+                GROUP BY pickup_location_id, dropoff_location_id
+                ORDER BY count DESC, pickup_location_id, dropoff_location_id
+                LIMIT ?
+            """, (k,))
         
-        # use custom algorithm
-        top_routes = self.top_k_finder.find_top_routes(route_counts, k)
+        top_routes = [((row[0], row[1]), row[2]) for row in rows]
         
         # get zone info
+        zones = self._zone_lookup()
         results = []
         for (pickup_id, dropoff_id), count in top_routes:
-            cur.execute("SELECT zone, borough FROM zones WHERE location_id = ?", (pickup_id,))
-            pickup_info = dict(cur.fetchone())
-            
-            cur.execute("SELECT zone, borough FROM zones WHERE location_id = ?", (dropoff_id,))
-            dropoff_info = dict(cur.fetchone())
+            pickup_zone, pickup_borough = zones[pickup_id]
+            dropoff_zone, dropoff_borough = zones[dropoff_id]
             
             results.append({
                 'pickup_location_id': pickup_id,
-                'pickup_zone': pickup_info['zone'],
-                'pickup_borough': pickup_info['borough'],
+                'pickup_zone': pickup_zone,
+                'pickup_borough': pickup_borough,
                 'dropoff_location_id': dropoff_id,
-                'dropoff_zone': dropoff_info['zone'],
-                'dropoff_borough': dropoff_info['borough'],
+                'dropoff_zone': dropoff_zone,
+                'dropoff_borough': dropoff_borough,
                 'trip_count': count
             })
         
-        conn.close()
         return results
     
     def detect_anomalies(self, sample_size=10000):
@@ -136,53 +253,124 @@ class AnalyticsService:
         Run anomaly detection on sample of trips
         Uses our custom anomaly detector
         """
+        sample_size = max(sample_size, 0)
+        
         conn = self.get_conn()
         cur = conn.cursor()
         
         # get random sample
-        cur.execute("""
-            SELECT 
-                trip_id,
-                fare_amount,
-                trip_distance,
-                trip_duration_min
-            FROM trips
-            ORDER BY RANDOM()
-            LIMIT ?
-        """, (sample_size,))
-        
-        rows = cur.fetchall()
-        trips = [dict(row) for row in rows]
+        trip_id, fare, distance, duration = self._sample_trip_columns(cur, sample_size)
+        n = len(trip_id)
         
         # run anomaly detection
-        anomalies = self.anomaly_detector.detect_all_anomalies(trips)
-        summary = self.anomaly_detector.get_anomaly_summary(trips)
-        
-        conn.close()
+        anomalies = self.anomaly_detector.detect_all_anomalies_soa(fare, distance, duration, trip_id)
+        summary = self.anomaly_detector.summarize(anomalies, n)
         
         return {
             'summary': summary,
             'anomalies': anomalies
         }
     
+    def _sample_trip_columns(self, cur, sample_size, chunk_size=500):
+        """
+        Uniform random sample of trips as numpy columns
+        (trip_id, fare, distance, duration)
+        
+        Draws distinct random trip_ids (trip_id is the rowid) and looks them
+        up by primary key in chunks of chunk_size, instead of ORDER BY
+        RANDOM() which has to scan and sort the whole table. Draws 20%
+        extra to cover gaps in the id range, then trims to sample_size
+        """
+        dtypes = (np.int64, np.float32, np.float32, np.float32)
+        
+        cur.execute("SELECT MAX(rowid) FROM trips")
+        max_rowid = cur.fetchone()[0] or 0
+        
+        rng = np.random.default_rng()
+        draw = min(int(sample_size * 1.2) + 1, max_rowid) if sample_size else 0
+        ids = rng.choice(max_rowid, size=draw, replace=False) + 1
+        ids.sort()
+        
+        parts = []
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size].tolist()
+            placeholders = ','.join('?' * len(chunk))
+            cur.execute(f"""
+                SELECT 
+                    trip_id,
+                    fare_amount / 100.0,
+                    trip_distance / 100.0,
+                    trip_duration_min
+                FROM trips
+                WHERE rowid IN ({placeholders})
+            """, chunk)
+            parts.append(self._fetch_columns(cur, len(chunk), dtypes))
+        
+        if not parts:
+            return [np.empty(0, dtype=dtype) for dtype in dtypes]
+        
+        columns = [np.concatenate(column) for column in zip(*parts)]
+        
+        # drop the oversampled extras at random, keeping rowid order
+        n = len(columns[0])
+        if n > sample_size:
+            keep = np.sort(rng.choice(n, size=sample_size, replace=False))
+            columns = [column[keep] for column in columns]
+        
+        return columns
+    
+    def _fetch_columns(self, cur, capacity, dtypes):
+        """
+        Read an executed cursor into preallocated numpy columns
+        
+        Rows come in cursor.arraysize batches via fetchmany, so only one
+        batch of row tuples is alive at a time. capacity is the expected
+        row count (the query's LIMIT); columns grow if it's exceeded
+        """
+        capacity = min(capacity, 1_000_000)
+        columns = [np.empty(capacity, dtype=dtype) for dtype in dtypes]
+        cur.arraysize = 10000
+        n = 0
+        
+        while True:
+            rows = cur.fetchmany()
+            if not rows:
+                break
+            m = len(rows)
+            if n + m > len(columns[0]):
+                size = max(2 * len(columns[0]), n + m)
+                columns = [np.concatenate([column, np.empty(size - len(column), dtype=column.dtype)])
+                           for column in columns]
+            for column, values in zip(columns, zip(*rows)):
+                column[n:n + m] = values
+            n += m
+        
+        return [column[:n] for column in columns]
+    
     def analyze_speed_patterns(self):
         """Analyze average speeds by hour"""
         conn = self.get_conn()
         cur = conn.cursor()
         
-        cur.execute("""
-            SELECT 
-                pickup_hour,
-                AVG(avg_speed_mph) as avg_speed,
-                COUNT(*) as trip_count
-            FROM trips
-            WHERE avg_speed_mph > 0 AND avg_speed_mph < 80
-            GROUP BY pickup_hour
-            ORDER BY pickup_hour
-        """)
-        
-        rows = cur.fetchall()
-        conn.close()
+        if has_table(cur, 'hourly_stats'):
+            cur.execute("""
+                SELECT pickup_hour, avg_speed, speed_trip_count as trip_count
+                FROM hourly_stats
+                WHERE speed_trip_count > 0
+                ORDER BY pickup_hour
+            """)
+            rows = cur.fetchall()
+        else:
+            rows = self._scan(cur, """
+                SELECT 
+                    pickup_hour,
+                    AVG(avg_speed_mph) / 100.0 as avg_speed,
+                    COUNT(*) as trip_count
+                FROM trips
+                WHERE avg_speed_mph > 0 AND avg_speed_mph < 8000
+                GROUP BY pickup_hour
+                ORDER BY pickup_hour
+            """)
         
         return [{
             'hour': row['pickup_hour'],
@@ -195,19 +383,24 @@ class AnalyticsService:
         conn = self.get_conn()
         cur = conn.cursor()
         
-        cur.execute("""
-            SELECT 
-                pickup_hour,
-                COUNT(*) as trip_count,
-                SUM(fare_amount) as total_revenue,
-                AVG(fare_amount) as avg_fare
-            FROM trips
-            GROUP BY pickup_hour
-            ORDER BY pickup_hour
-        """)
-        
-        rows = cur.fetchall()
-        conn.close()
+        if has_table(cur, 'hourly_stats'):
+            cur.execute("""
+                SELECT pickup_hour, trip_count, total_revenue, avg_fare
+                FROM hourly_stats
+                ORDER BY pickup_hour
+            """)
+            rows = cur.fetchall()
+        else:
+            rows = self._scan(cur, """
+                SELECT 
+                    pickup_hour,
+                    COUNT(*) as trip_count,
+                    SUM(fare_amount) / 100.0 as total_revenue,
+                    AVG(fare_amount) / 100.0 as avg_fare
+                FROM trips
+                GROUP BY pickup_hour
+                ORDER BY pickup_hour
+            """)
         
         return [{
             'hour': row['pickup_hour'],
@@ -221,24 +414,32 @@ class AnalyticsService:
         conn = self.get_conn()
         cur = conn.cursor()
         
-        cur.execute("""
-            SELECT 
-                z.borough,
-                COUNT(t.trip_id) as trip_count,
-                AVG(t.fare_amount) as avg_fare,
-                AVG(t.trip_distance) as avg_distance,
-                AVG(t.trip_duration_min) as avg_duration,
-                AVG(t.avg_speed_mph) as avg_speed,
-                SUM(t.fare_amount) as total_revenue
-            FROM trips t
-            JOIN zones z ON t.pickup_location_id = z.location_id
-            GROUP BY z.borough
-            ORDER BY trip_count DESC
-        """)
-        
-        rows = cur.fetchall()
-        conn.close()
+        if has_table(cur, 'borough_stats'):
+            cur.execute("""
+                SELECT * FROM borough_stats
+                ORDER BY trip_count DESC
+            """)
+            rows = cur.fetchall()
+        else:
+            rows = self._scan(cur, """
+                SELECT 
+                    z.borough,
+                    COUNT(t.trip_id) as trip_count,
+                    AVG(t.fare_amount) / 100.0 as avg_fare,
+                    AVG(t.trip_distance) / 100.0 as avg_distance,
+                    AVG(t.trip_duration_min) as avg_duration,
+                    AVG(t.avg_speed_mph) / 100.0 as avg_speed,
+                    SUM(t.fare_amount) / 100.0 as total_revenue
+                FROM trips t
+                JOIN zones z ON t.pickup_location_id = z.location_id
+                GROUP BY z.borough
+                ORDER BY trip_count DESC
+            """)
         
+        return self._borough_results(rows)
+    
+    def _borough_results(self, rows):
+        """compare_boroughs entries for rows of per-borough totals"""
         return [{
             'borough': row['borough'],
             'trip_count': row['trip_count'],
@@ -254,21 +455,17 @@ class AnalyticsService:
         Get key insights - combines multiple analyses
         Returns top findings
         """
-        # top zones
-        top_pickup_zones = self.analyze_top_zones(k=3, metric='pickups')
-        top_revenue_zones = self.analyze_top_zones(k=3, metric='revenue')
+        # top zones and borough comparison - all from one pass
+        top_pickup_zones, top_revenue_zones, borough_stats = self._pickup_zone_insights(k=3)
         
         # top routes
         top_routes = self.analyze_top_routes(k=3)
         
-        # borough comparison
-        borough_stats = self.compare_boroughs()
-        
         # speed patterns
         speed_by_hour = self.analyze_speed_patterns()
         
-        # find rush hours (lowest speed)
-        slowest_hours = sorted(speed_by_hour, key=lambda x: x['avg_speed'])[:3]
+        # find rush hours (lowest speed) - partial selection, no full sort
+        slowest_hours = heapq.nsmallest(3, speed_by_hour, key=lambda x: x['avg_speed'])
         
         return {
             'top_pickup_zones': top_pickup_zones,
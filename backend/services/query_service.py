@@ -2,41 +2,66 @@
 Query Service - handles common database queries
 """
 
-import sqlite3
-import os
-from dotenv import load_dotenv
+from config import DB_PATH
+from db import get_conn, fetch_dicts, has_table, to_hundredths, trip_columns
 
-load_dotenv()
+# (filter key, predicate) for search_trips, in the order they appear in
+# the WHERE clause
+SEARCH_PREDICATES = (
+    ('start_date', 't.pickup_datetime >= ?'),
+    ('end_date', 't.pickup_datetime <= ?'),
+    ('min_fare', 't.fare_amount >= ?'),
+    ('max_fare', 't.fare_amount <= ?'),
+    ('pickup_zone', 't.pickup_location_id = ?'),
+    ('dropoff_zone', 't.dropoff_location_id = ?'),
+)
+
+# filters on fare_amount, stored in cents (db.SCALED_TRIP_COLUMNS)
+SCALED_SEARCH_FILTERS = frozenset(('min_fare', 'max_fare'))
+
+# search_trips statement per set of filter keys - built once per shape
+# (at most 64), so each keeps its prepared plan in the sqlite3 cache
+_SEARCH_CACHE = {}
 
 class QueryService:
     """Service for executing common database queries"""
     
     def __init__(self, db_path=None):
-        self.db_path = db_path or os.getenv('DB_PATH', 'database/nyc_taxi.db')
+        self.db_path = db_path or DB_PATH
     
     def get_conn(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        # per-thread shared connection - not closed after each query
+        return get_conn(self.db_path)
     
     def get_basic_stats(self):
         """Get overall statistics"""
         conn = self.get_conn()
         cur = conn.cursor()
         
+        # precomputed at ingest (aggregates.sql)
+        if has_table(cur, 'meta'):
+            cur.execute("""
+                SELECT key, value FROM meta
+                WHERE key IN ('trip_count', 'avg_fare', 'avg_distance', 'avg_duration', 'total_revenue')
+            """)
+            meta = {row['key']: row['value'] for row in cur.fetchall()}
+            if len(meta) == 5:
+                return self._format_basic_stats({'total_trips': meta.pop('trip_count'), **meta})
+        
         cur.execute("""
             SELECT 
                 COUNT(*) as total_trips,
-                AVG(fare_amount) as avg_fare,
-                AVG(trip_distance) as avg_distance,
+                AVG(fare_amount) / 100.0 as avg_fare,
+                AVG(trip_distance) / 100.0 as avg_distance,
                 AVG(trip_duration_min) as avg_duration,
-                SUM(fare_amount) as total_revenue
+                SUM(fare_amount) / 100.0 as total_revenue
             FROM trips
         """)
         
-        result = dict(cur.fetchone())
-        conn.close()
-        
+        return self._format_basic_stats(dict(cur.fetchone()))
+    
+    def _format_basic_stats(self, result):
+        """Round the overall stats for the API"""
         return {
             'total_trips': result['total_trips'],
             'avg_fare': round(result['avg_fare'], 2) if result['avg_fare'] else 0,
@@ -50,19 +75,25 @@ class QueryService:
         conn = self.get_conn()
         cur = conn.cursor()
         
-        cur.execute("""
-            SELECT 
-                pickup_hour,
-                COUNT(*) as trip_count,
-                AVG(fare_amount) as avg_fare,
-                AVG(trip_distance) as avg_distance
-            FROM trips
-            GROUP BY pickup_hour
-            ORDER BY pickup_hour
-        """)
+        if has_table(cur, 'hourly_stats'):
+            cur.execute("""
+                SELECT pickup_hour, trip_count, avg_fare, avg_distance
+                FROM hourly_stats
+                ORDER BY pickup_hour
+            """)
+        else:
+            cur.execute("""
+                SELECT 
+                    pickup_hour,
+                    COUNT(*) as trip_count,
+                    AVG(fare_amount) / 100.0 as avg_fare,
+                    AVG(trip_distance) / 100.0 as avg_distance
+                FROM trips
+                GROUP BY pickup_hour
+                ORDER BY pickup_hour
+            """)
         
         rows = cur.fetchall()
-        conn.close()
         
         return [{
             'hour': row['pickup_hour'],
@@ -76,21 +107,27 @@ class QueryService:
         conn = self.get_conn()
         cur = conn.cursor()
         
-        cur.execute("""
-            SELECT 
-                z.borough,
-                COUNT(t.trip_id) as trip_count,
-                AVG(t.fare_amount) as avg_fare,
-                AVG(t.trip_distance) as avg_distance,
-                SUM(t.fare_amount) as total_revenue
-            FROM trips t
-            JOIN zones z ON t.pickup_location_id = z.location_id
-            GROUP BY z.borough
-            ORDER BY trip_count DESC
-        """)
+        if has_table(cur, 'borough_stats'):
+            cur.execute("""
+                SELECT borough, trip_count, avg_fare, avg_distance, total_revenue
+                FROM borough_stats
+                ORDER BY trip_count DESC
+            """)
+        else:
+            cur.execute("""
+                SELECT 
+                    z.borough,
+                    COUNT(t.trip_id) as trip_count,
+                    AVG(t.fare_amount) / 100.0 as avg_fare,
+                    AVG(t.trip_distance) / 100.0 as avg_distance,
+                    SUM(t.fare_amount) / 100.0 as total_revenue
+                FROM trips t
+                JOIN zones z ON t.pickup_location_id = z.location_id
+                GROUP BY z.borough
+                ORDER BY trip_count DESC
+            """)
         
         rows = cur.fetchall()
-        conn.close()
         
         return [{
             'borough': row['borough'],
@@ -105,47 +142,68 @@ class QueryService:
         conn = self.get_conn()
         cur = conn.cursor()
         
-        cur.execute("""
-            SELECT 
-                z.location_id,
-                z.zone,
-                z.borough,
-                COUNT(t.trip_id) as pickup_count,
-                AVG(t.fare_amount) as avg_fare
-            FROM zones z
-            LEFT JOIN trips t ON z.location_id = t.pickup_location_id
-            GROUP BY z.location_id
-            ORDER BY pickup_count DESC
-            LIMIT ?
-        """, (limit,))
-        
-        rows = cur.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        if has_table(cur, 'zone_pickup_counts'):
+            cur.execute("""
+                SELECT 
+                    z.location_id,
+                    z.zone,
+                    z.borough,
+                    COALESCE(c.trip_count, 0) as pickup_count,
+                    c.avg_fare
+                FROM zones z
+                LEFT JOIN zone_pickup_counts c ON c.location_id = z.location_id
+                ORDER BY pickup_count DESC
+                LIMIT ?
+            """, (limit,))
+        else:
+            cur.execute("""
+                SELECT 
+                    z.location_id,
+                    z.zone,
+                    z.borough,
+                    COUNT(t.trip_id) as pickup_count,
+                    AVG(t.fare_amount) / 100.0 as avg_fare
+                FROM zones z
+                LEFT JOIN trips t ON z.location_id = t.pickup_location_id
+                GROUP BY z.location_id
+                ORDER BY pickup_count DESC
+                LIMIT ?
+            """, (limit,))
+        
+        return fetch_dicts(cur)
     
     def get_top_dropoff_zones(self, limit=10):
         """Get zones with most dropoffs"""
         conn = self.get_conn()
         cur = conn.cursor()
         
-        cur.execute("""
-            SELECT 
-                z.location_id,
-                z.zone,
-                z.borough,
-                COUNT(t.trip_id) as dropoff_count
-            FROM zones z
-            LEFT JOIN trips t ON z.location_id = t.dropoff_location_id
-            GROUP BY z.location_id
-            ORDER BY dropoff_count DESC
-            LIMIT ?
-        """, (limit,))
-        
-        rows = cur.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        if has_table(cur, 'zone_dropoff_counts'):
+            cur.execute("""
+                SELECT 
+                    z.location_id,
+                    z.zone,
+                    z.borough,
+                    COALESCE(c.trip_count, 0) as dropoff_count
+                FROM zones z
+                LEFT JOIN zone_dropoff_counts c ON c.location_id = z.location_id
+                ORDER BY dropoff_count DESC
+                LIMIT ?
+            """, (limit,))
+        else:
+            cur.execute("""
+                SELECT 
+                    z.location_id,
+                    z.zone,
+                    z.borough,
+                    COUNT(t.trip_id) as dropoff_count
+                FROM zones z
+                LEFT JOIN trips t ON z.location_id = t.dropoff_location_id
+                GROUP BY z.location_id
+                ORDER BY dropoff_count DESC
+                LIMIT ?
+            """, (limit,))
+        
+        return fetch_dicts(cur)
     
     def get_popular_routes(self, limit=10):
         """Get most common pickup->dropoff routes"""
@@ -161,8 +219,8 @@ class QueryService:
                 do_zone.zone as dropoff_zone,
                 do_zone.borough as dropoff_borough,
                 COUNT(*) as trip_count,
-                AVG(t.fare_amount) as avg_fare,
-                AVG(t.trip_distance) as avg_distance
+                AVG(t.fare_amount) / 100.0 as avg_fare,
+                AVG(t.trip_distance) / 100.0 as avg_distance
             FROM trips t
             JOIN zones pu_zone ON t.pickup_location_id = pu_zone.location_id
             JOIN zones do_zone ON t.dropoff_location_id = do_zone.location_id
@@ -171,17 +229,14 @@ class QueryService:
             LIMIT ?
         """, (limit,))
         
-        rows = cur.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        return fetch_dicts(cur)
     
     def get_fare_distribution(self, bins=10):
         """Get fare amount distribution"""
         conn = self.get_conn()
         cur = conn.cursor()
         
-        # get min/max fare
+        # get min/max fare - the bins are worked out in cents, as stored
         cur.execute("SELECT MIN(fare_amount) as min_fare, MAX(fare_amount) as max_fare FROM trips")
         range_data = dict(cur.fetchone())
         
@@ -190,27 +245,38 @@ class QueryService:
         
         # calculate bin size
         bin_size = (max_fare - min_fare) / bins
+        edges = [min_fare + (i * bin_size) for i in range(bins)]
+        
+        # count every bin in one pass (one GROUP BY instead of a range
+        # query per bin), binned like numpy.histogram: the bin is
+        # estimated by division, then moved by one if the fare is outside
+        # [min + b * size, min + (b + 1) * size), so a fare right on an
+        # edge goes in the bin that starts there. The last bin also
+        # holds the max fare
+        counts = {}
+        if bin_size > 0:
+            cur.execute("""
+                SELECT 
+                    MIN(b - (fare_amount < ? + b * ?) + (fare_amount >= ? + (b + 1) * ?), ?) as bin,
+                    COUNT(*) as count
+                FROM (
+                    SELECT fare_amount, MIN(CAST((fare_amount - ?) / ? AS INTEGER), ?) as b
+                    FROM trips
+                )
+                GROUP BY bin
+            """, (min_fare, bin_size, min_fare, bin_size, bins - 1,
+                  min_fare, bin_size, bins - 1))
+            counts = {row['bin']: row['count'] for row in cur.fetchall()}
         
-        # manually create bins and count
         distribution = []
-        for i in range(bins):
-            bin_start = min_fare + (i * bin_size)
+        for i, bin_start in enumerate(edges):
             bin_end = bin_start + bin_size
-            
-            cur.execute("""
-                SELECT COUNT(*) as count
-                FROM trips
-                WHERE fare_amount >= ? AND fare_amount < ?
-            """, (bin_start, bin_end))
-            
-            count = cur.fetchone()['count']
             distribution.append({
-                'bin_start': round(bin_start, 2),
-                'bin_end': round(bin_end, 2),
-                'count': count
+                'bin_start': round(bin_start / 100, 2),
+                'bin_end': round(bin_end / 100, 2),
+                'count': counts.get(i, 0)
             })
         
-        conn.close()
         return distribution
     
     def search_trips(self, filters):
@@ -229,47 +295,25 @@ class QueryService:
         conn = self.get_conn()
         cur = conn.cursor()
         
-        query = """
-            SELECT t.*,
-                   pu_zone.zone as pickup_zone,
-                   do_zone.zone as dropoff_zone
-            FROM trips t
-            JOIN zones pu_zone ON t.pickup_location_id = pu_zone.location_id
-            JOIN zones do_zone ON t.dropoff_location_id = do_zone.location_id
-            WHERE 1=1
-        """
-        params = []
-        
-        if 'start_date' in filters:
-            query += " AND t.pickup_datetime >= ?"
-            params.append(filters['start_date'])
-        
-        if 'end_date' in filters:
-            query += " AND t.pickup_datetime <= ?"
-            params.append(filters['end_date'])
-        
-        if 'min_fare' in filters:
-            query += " AND t.fare_amount >= ?"
-            params.append(filters['min_fare'])
-        
-        if 'max_fare' in filters:
-            query += " AND t.fare_amount <= ?"
-            params.append(filters['max_fare'])
-        
-        if 'pickup_zone' in filters:
-            query += " AND t.pickup_location_id = ?"
-            params.append(filters['pickup_zone'])
-        
-        if 'dropoff_zone' in filters:
-            query += " AND t.dropoff_location_id = ?"
-            params.append(filters['dropoff_zone'])
-        
-        limit = filters.get('limit', 100)
-        query += " ORDER BY t.pickup_datetime DESC LIMIT ?"
-        params.append(limit)
+        shape = frozenset(key for key, _ in SEARCH_PREDICATES if key in filters)
+        query = _SEARCH_CACHE.get(shape)
+        if query is None:
+            query = _SEARCH_CACHE[shape] = """
+                SELECT """ + trip_columns('t') + """,
+                       pu_zone.zone as pickup_zone,
+                       do_zone.zone as dropoff_zone
+                FROM trips t
+                JOIN zones pu_zone ON t.pickup_location_id = pu_zone.location_id
+                JOIN zones do_zone ON t.dropoff_location_id = do_zone.location_id
+                WHERE 1=1""" + "".join(
+                    f" AND {predicate}" for key, predicate in SEARCH_PREDICATES if key in shape) + """
+                ORDER BY t.pickup_datetime DESC LIMIT ?
+            """
+        
+        params = [to_hundredths(filters[key]) if key in SCALED_SEARCH_FILTERS else filters[key]
+                  for key, _ in SEARCH_PREDICATES if key in shape]
+        params.append(filters.get('limit', 100))
         
         cur.execute(query, params)
-        rows = cur.fetchall()
-        conn.close()
         
-        return [dict(row) for row in rows]
\ No newline at end of file
+        return fetch_dicts(cur)
\ No newline at end of file
@@ -0,0 +1,134 @@
+-- Precomputed aggregates over trips
+-- Run at the end of seed.py, or on its own with backend/script/build_aggregates.py
+-- The API reads these instead of scanning trips, and falls back to live
+-- queries when they don't exist. trips stores money in cents and
+-- distance/speed in hundredths (schema.sql); these tables hold dollars,
+-- miles and mph, as the API returns them
+
+BEGIN;
+
+-- ============================================
+-- Per-zone totals
+-- ============================================
+DROP TABLE IF EXISTS zone_pickup_counts;
+CREATE TABLE zone_pickup_counts (
+    location_id INTEGER PRIMARY KEY,
+    trip_count INTEGER NOT NULL,
+    total_revenue REAL NOT NULL,
+    avg_fare REAL
+);
+INSERT INTO zone_pickup_counts (location_id, trip_count, total_revenue, avg_fare)
+SELECT pickup_location_id, COUNT(*), SUM(fare_amount) / 100.0, AVG(fare_amount) / 100.0
+FROM trips
+GROUP BY pickup_location_id;
+CREATE INDEX idx_zone_pickup_counts_count ON zone_pickup_counts(trip_count DESC);
+CREATE INDEX idx_zone_pickup_counts_revenue ON zone_pickup_counts(total_revenue DESC);
+
+DROP TABLE IF EXISTS zone_dropoff_counts;
+CREATE TABLE zone_dropoff_counts (
+    location_id INTEGER PRIMARY KEY,
+    trip_count INTEGER NOT NULL
+);
+INSERT INTO zone_dropoff_counts (location_id, trip_count)
+SELECT dropoff_location_id, COUNT(*)
+FROM trips
+GROUP BY dropoff_location_id;
+CREATE INDEX idx_zone_dropoff_counts_count ON zone_dropoff_counts(trip_count DESC);
+
+-- ============================================
+-- Per-route totals
+-- ============================================
+DROP TABLE IF EXISTS route_counts;
+CREATE TABLE route_counts (
+    pickup_location_id INTEGER NOT NULL,
+    dropoff_location_id INTEGER NOT NULL,
+    trip_count INTEGER NOT NULL,
+    PRIMARY KEY (pickup_location_id, dropoff_location_id)
+);
+INSERT INTO route_counts (pickup_location_id, dropoff_location_id, trip_count)
+SELECT pickup_location_id, dropoff_location_id, COUNT(*)
+FROM trips
+GROUP BY pickup_location_id, dropoff_location_id;
+CREATE INDEX idx_route_counts_count ON route_counts(trip_count DESC);
+
+-- ============================================
+-- Per-hour totals
+-- ============================================
+DROP TABLE IF EXISTS hourly_stats;
+CREATE TABLE hourly_stats (
+    pickup_hour INTEGER PRIMARY KEY,
+    trip_count INTEGER NOT NULL,
+    total_revenue REAL NOT NULL,
+    avg_fare REAL,
+    avg_distance REAL,
+    -- speed stats only count plausible speeds (0-80 mph)
+    speed_trip_count INTEGER NOT NULL,
+    avg_speed REAL
+);
+INSERT INTO hourly_stats
+SELECT
+    pickup_hour,
+    COUNT(*),
+    SUM(fare_amount) / 100.0,
+    AVG(fare_amount) / 100.0,
+    AVG(trip_distance) / 100.0,
+    COUNT(CASE WHEN avg_speed_mph > 0 AND avg_speed_mph < 8000 THEN 1 END),
+    AVG(CASE WHEN avg_speed_mph > 0 AND avg_speed_mph < 8000 THEN avg_speed_mph END) / 100.0
+FROM trips
+GROUP BY pickup_hour;
+
+-- ============================================
+-- Per-borough totals (by pickup zone)
+-- ============================================
+DROP TABLE IF EXISTS borough_stats;
+CREATE TABLE borough_stats (
+    borough VARCHAR(50) PRIMARY KEY,
+    trip_count INTEGER NOT NULL,
+    avg_fare REAL,
+    avg_distance REAL,
+    avg_duration REAL,
+    avg_speed REAL,
+    total_revenue REAL NOT NULL
+);
+INSERT INTO borough_stats
+SELECT
+    z.borough,
+    COUNT(t.trip_id),
+    AVG(t.fare_amount) / 100.0,
+    AVG(t.trip_distance) / 100.0,
+    AVG(t.trip_duration_min),
+    AVG(t.avg_speed_mph) / 100.0,
+    SUM(t.fare_amount) / 100.0
+FROM trips t
+JOIN zones z ON t.pickup_location_id = z.location_id
+GROUP BY z.borough;
+
+-- ============================================
+-- Dataset-level values (trip total for pagination, overall stats)
+-- ============================================
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+INSERT OR REPLACE INTO meta (key, value)
+SELECT
+    k.column1,
+    CASE k.column1
+        WHEN 'trip_count' THEN s.trip_count
+        WHEN 'avg_fare' THEN s.avg_fare
+        WHEN 'avg_distance' THEN s.avg_distance
+        WHEN 'avg_duration' THEN s.avg_duration
+        WHEN 'total_revenue' THEN s.total_revenue
+    END
+FROM (
+    -- one pass over trips for all the dataset totals
+    SELECT
+        COUNT(*) as trip_count,
+        AVG(fare_amount) / 100.0 as avg_fare,
+        AVG(trip_distance) / 100.0 as avg_distance,
+        AVG(trip_duration_min) as avg_duration,
+        SUM(fare_amount) / 100.0 as total_revenue
+    FROM trips
+) s, (VALUES ('trip_count'), ('avg_fare'), ('avg_distance'), ('avg_duration'), ('total_revenue')) k;
+
+COMMIT;
@@ -1,5 +1,36 @@
--- Additional Performance Indexes
--- Run this after initial data load for optimal query performance
+-- Indexes over the loaded tables
+-- Run by seed.py after the bulk insert into trips
+
+-- Index for time-based queries (most common)
+CREATE INDEX idx_pickup_datetime ON trips(pickup_datetime);
+CREATE INDEX idx_pickup_hour ON trips(pickup_hour);
+
+-- Index for location-based queries
+CREATE INDEX idx_pickup_location ON trips(pickup_location_id);
+CREATE INDEX idx_dropoff_location ON trips(dropoff_location_id);
+
+-- Covering index for pickup counts + revenue per zone (top zones,
+-- zone_pickup_counts) - the GROUP BY never reads the table rows
+CREATE INDEX idx_trips_pickup_fare ON trips(pickup_location_id, fare_amount);
+
+-- Composite index for zone-to-zone analysis
+CREATE INDEX idx_pickup_dropoff ON trips(pickup_location_id, dropoff_location_id);
+
+-- Zone filter + newest-first ordering on /api/trips
+CREATE INDEX idx_trips_pickup_time ON trips(pickup_location_id, pickup_datetime);
+CREATE INDEX idx_trips_dropoff_time ON trips(dropoff_location_id, pickup_datetime);
+
+-- Index for fare analysis
+CREATE INDEX idx_fare_amount ON trips(fare_amount);
+
+-- Covering index for date range + fare counts
+CREATE INDEX idx_trips_time_fare ON trips(pickup_datetime, fare_amount);
+
+-- Index for distance queries
+CREATE INDEX idx_trip_distance ON trips(trip_distance);
+
+-- Zone lookup optimization
+CREATE INDEX idx_zone_borough ON zones(borough);
 
 -- Composite indexes for common query patterns
 
@@ -22,6 +53,14 @@ CREATE INDEX IF NOT EXISTS idx_passenger_count ON trips(passenger_count);
 -- Date range queries (covering index)
 CREATE INDEX IF NOT EXISTS idx_datetime_range ON trips(pickup_datetime, dropoff_datetime);
 
--- Analyze tables for query optimizer
+-- Zone name search (zones_fts is declared in schema.sql)
+INSERT INTO zones_fts(zones_fts) VALUES ('rebuild');
+
+-- Zone name prefix search (Zone.search's LIKE fallback) - LIKE is case
+-- insensitive, so only a NOCASE index can serve 'prefix%'
+CREATE INDEX IF NOT EXISTS idx_zones_name_nocase ON zones(zone COLLATE NOCASE);
+
+-- Planner statistics (sqlite_stat1) for all of the above, so compound
+-- filters pick the most selective index instead of guessing
 ANALYZE trips;
 ANALYZE zones;
@@ -1,11 +1,141 @@
 import sqlite3
+import itertools
+from functools import lru_cache
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import os
 from datetime import datetime
 
-def seed_database(db_path, schema_path, cleaned_trips_path, zones_lookup_path):
+# bulk load tuning - the database is rebuilt from scratch on every seed,
+# so there's nothing a crash mid-load could corrupt that a reseed won't fix
+BULK_LOAD_PRAGMAS = (
+    'PRAGMA journal_mode=OFF',
+    'PRAGMA synchronous=OFF',
+    'PRAGMA cache_size=-200000',
+    'PRAGMA temp_store=MEMORY',
+)
+
+BATCH_SIZE = 100_000
+
+TRIP_COLUMNS = (
+    'pickup_datetime', 'dropoff_datetime', 'passenger_count',
+    'trip_distance', 'pickup_location_id', 'dropoff_location_id',
+    'fare_amount', 'tip_amount', 'total_amount',
+    'trip_duration_min', 'avg_speed_mph', 'pickup_hour',
+)
+
+# trips per multi-row INSERT - SQLite before 3.32 allows only 999 bound
+# parameters per statement
+ROWS_PER_INSERT = 500 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999 // len(TRIP_COLUMNS)
+
+# same text format the CSV export used
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# lookup values that mean "no value"
+MISSING_TEXT = ('N/A', '')
+
+def _zone_text(column, default):
+    """Stripped text of a zone lookup column, default where it's missing or N/A"""
+    text = column.astype(str).str.strip()
+    missing = column.isna() | text.isin(MISSING_TEXT)
+    return text.astype(object).where(~missing, default).tolist()
+
+def _timestamp_text(column):
+    # Parquet has no seconds unit - drop the sub-second part it was widened
+    # to (or that the source had) first, since a safe cast refuses to
+    return pc.strftime(pc.cast(pc.floor_temporal(column, unit='second'), pa.timestamp('s')),
+                       format=TIMESTAMP_FORMAT)
+
+@lru_cache(maxsize=4)
+def _insert_sql(n_rows):
+    """INSERT INTO trips with n_rows rows of placeholders"""
+    row = '(' + ', '.join('?' * len(TRIP_COLUMNS)) + ')'
+    return f"INSERT INTO trips ({', '.join(TRIP_COLUMNS)}) VALUES " + ', '.join([row] * n_rows)
+
+def _hundredths(column):
+    """Dollars/miles/mph as the integer cents/hundredths trips stores (schema.sql)"""
+    return pc.cast(pc.round(pc.multiply(column, 100)), pa.int64())
+
+def _trip_rows(batch):
+    """
+    Insert tuples for one record batch of the cleaned trips Parquet file
+    
+    Trips whose distance or total rounds to 0 hundredths (under half a
+    cent / 0.005 mi) are left out - they'd fail the positive CHECKs
+    """
+    distance = _hundredths(batch.column('trip_distance'))
+    total = _hundredths(batch.column('total_amount'))
+    columns = (
+        _timestamp_text(batch.column('tpep_pickup_datetime')),
+        _timestamp_text(batch.column('tpep_dropoff_datetime')),
+        pc.cast(batch.column('passenger_count'), pa.int64()),
+        distance,
+        batch.column('PULocationID'),
+        batch.column('DOLocationID'),
+        _hundredths(batch.column('fare_amount')),
+        _hundredths(pc.fill_null(batch.column('tip_amount'), 0.0)),
+        total,
+        batch.column('trip_duration_min'),
+        _hundredths(pc.fill_null(batch.column('avg_speed_mph'), 0.0)),
+        batch.column('pickup_hour'),
+    )
+    
+    keep = pc.fill_null(pc.and_(pc.greater(distance, 0), pc.greater(total, 0)), False)
+    if pc.all(keep).as_py() is not True:
+        columns = [pc.filter(column, keep) for column in columns]
+    return zip(*(column.to_pylist() for column in columns))
+
+def load_to_sqlite(parquet_path, db_path):
+    """
+    Bulk insert the cleaned trips Parquet file into the trips table
+    All batches go in one transaction; returns the number of trips loaded
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(pragma)
+    
+    trips_inserted = 0
+    trips_skipped = 0
+    try:
+        conn.execute("BEGIN")
+        for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=BATCH_SIZE):
+            # multi-row INSERTs - SQLite parses and steps one statement
+            # per ROWS_PER_INSERT trips instead of one per trip
+            rows = list(_trip_rows(batch))
+            for start in range(0, len(rows), ROWS_PER_INSERT):
+                chunk = rows[start:start + ROWS_PER_INSERT]
+                conn.execute(_insert_sql(len(chunk)), list(itertools.chain.from_iterable(chunk)))
+            
+            trips_inserted += len(rows)
+            trips_skipped += batch.num_rows - len(rows)
+            print(f"Inserted {trips_inserted:,} trips...")
+        conn.execute("COMMIT")
+        if trips_skipped:
+            print(f"Skipped {trips_skipped:,} trips with a distance or total under 0.005")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    
+    return trips_inserted
+
+# indexes and summary tables every seeded database gets, unless the
+# caller passes other files
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEXES_PATH = os.path.join(DATABASE_DIR, 'indexes.sql')
+AGGREGATES_PATH = os.path.join(DATABASE_DIR, 'aggregates.sql')
+
+def seed_database(db_path, schema_path, cleaned_trips_path, zones_lookup_path,
+                  indexes_path=INDEXES_PATH, aggregates_path=AGGREGATES_PATH):
     """
     Seed the database with cleaned trip data and zone lookup data
+    
+    indexes_path / aggregates_path default to this directory's
+    indexes.sql and aggregates.sql - pass None to skip either
     """
     print("Starting database seeding process...")
     start_time = datetime.now()
@@ -26,69 +156,41 @@ def seed_database(db_path, schema_path, cleaned_trips_path, zones_lookup_path):
     print("Loading zones data...")
     zones_df = pd.read_csv(zones_lookup_path)
     
-    # Insert zones
-    zones_inserted = 0
-    for _, row in zones_df.iterrows():
-        # Handle N/A and empty values
-        borough = str(row['Borough']).strip() if pd.notna(row['Borough']) and str(row['Borough']).strip() not in ['N/A', ''] else 'Unknown'
-        zone = str(row['Zone']).strip() if pd.notna(row['Zone']) and str(row['Zone']).strip() not in ['N/A', ''] else 'Unknown'
-        service_zone = str(row['service_zone']).strip() if pd.notna(row['service_zone']) and str(row['service_zone']).strip() not in ['N/A', ''] else None
-        
-        cursor.execute("""
-            INSERT INTO zones (location_id, borough, zone, service_zone)
-            VALUES (?, ?, ?, ?)
-        """, (
-            int(row['LocationID']),
-            borough,
-            zone,
-            service_zone
-        ))
-        zones_inserted += 1
+    # Insert zones - each column is cleaned in one pass (N/A and empty
+    # values become Unknown, or NULL for service_zone)
+    zone_rows = list(zip(
+        zones_df['LocationID'].astype('int64').tolist(),
+        _zone_text(zones_df['Borough'], 'Unknown'),
+        _zone_text(zones_df['Zone'], 'Unknown'),
+        _zone_text(zones_df['service_zone'], None),
+    ))
+    cursor.executemany("""
+        INSERT INTO zones (location_id, borough, zone, service_zone)
+        VALUES (?, ?, ?, ?)
+    """, zone_rows)
+    zones_inserted = len(zone_rows)
     
     print(f"Inserted {zones_inserted} zones")
     
-    # Load trips data in chunks (memory efficient for large files)
+    # zones have to be committed before the bulk load opens its own connection
+    conn.commit()
+    
+    # Load trips data (this may take a few minutes)
     print("Loading trips data (this may take a few minutes)...")
-    chunk_size = 50000
-    trips_inserted = 0
+    load_to_sqlite(cleaned_trips_path, db_path)
     
-    for chunk in pd.read_csv(cleaned_trips_path, chunksize=chunk_size):
-        # Prepare data for insertion
-        trips_data = []
-        for _, row in chunk.iterrows():
-            trips_data.append((
-                row['tpep_pickup_datetime'],
-                row['tpep_dropoff_datetime'],
-                int(row['passenger_count']) if pd.notna(row['passenger_count']) else None,
-                float(row['trip_distance']),
-                int(row['PULocationID']),
-                int(row['DOLocationID']),
-                float(row['fare_amount']),
-                float(row['tip_amount']) if pd.notna(row['tip_amount']) else 0.0,
-                float(row['total_amount']),
-                float(row['trip_duration_min']),
-                float(row['avg_speed_mph']) if pd.notna(row['avg_speed_mph']) else 0.0,
-                int(row['pickup_hour'])
-            ))
-        
-        # Bulk insert
-        cursor.executemany("""
-            INSERT INTO trips (
-                pickup_datetime, dropoff_datetime, passenger_count,
-                trip_distance, pickup_location_id, dropoff_location_id,
-                fare_amount, tip_amount, total_amount,
-                trip_duration_min, avg_speed_mph, pickup_hour
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, trips_data)
-        
-        trips_inserted += len(trips_data)
-        print(f"Inserted {trips_inserted:,} trips...")
-        
-        # Commit periodically
-        conn.commit()
-    
-    # Final commit
-    conn.commit()
+    # Indexes go on after the load - one sort per index instead of
+    # updating every index on every insert
+    if indexes_path:
+        print("Creating indexes...")
+        with open(indexes_path, 'r') as f:
+            cursor.executescript(f.read())
+    
+    # Precompute the summary tables the API reads
+    if aggregates_path:
+        print("Building aggregate tables...")
+        with open(aggregates_path, 'r') as f:
+            cursor.executescript(f.read())
     
     # Verify data
     cursor.execute("SELECT COUNT(*) FROM zones")
@@ -119,7 +221,9 @@ if __name__ == '__main__':
     
     db_path = os.path.join(project_root, 'database', 'nyc_taxi.db')
     schema_path = os.path.join(project_root, 'database', 'schema.sql')
-    cleaned_trips_path = os.path.join(project_root, 'backend', 'data', 'processed', 'cleaned_trips.csv')
+    cleaned_trips_path = os.path.join(project_root, 'backend', 'data', 'processed', 'cleaned_trips.parquet')
     zones_lookup_path = os.path.join(project_root, 'backend', 'data', 'raw', 'taxi_zone_lookup.csv')
+    indexes_path = os.path.join(project_root, 'database', 'indexes.sql')
+    aggregates_path = os.path.join(project_root, 'database', 'aggregates.sql')
     
-    seed_database(db_path, schema_path, cleaned_trips_path, zones_lookup_path)
+    seed_database(db_path, schema_path, cleaned_trips_path, zones_lookup_path, indexes_path, aggregates_path)
@@ -5,6 +5,67 @@ Feature engineering - create derived features
 import pandas as pd
 import numpy as np
 
+# time_category is stored as a pandas Categorical of these - int8 codes
+# instead of a Python string per row
+TIME_CATEGORIES = ['Night', 'Morning Rush', 'Midday', 'Evening Rush']
+RUSH_HOUR_CODES = [TIME_CATEGORIES.index('Morning Rush'), TIME_CATEGORIES.index('Evening Rush')]
+
+# TIME_CATEGORIES code for each pickup hour (0-23): 6-9 morning rush,
+# 9-16 midday, 16-19 evening rush, night otherwise
+HOUR_TIME_CODE = np.zeros(24, dtype=np.int8)
+HOUR_TIME_CODE[6:9] = TIME_CATEGORIES.index('Morning Rush')
+HOUR_TIME_CODE[9:16] = TIME_CATEGORIES.index('Midday')
+HOUR_TIME_CODE[16:19] = TIME_CATEGORIES.index('Evening Rush')
+
+# smallest dtype that holds each engineered column (durations are at
+# most 1440 minutes, speeds 0-80 mph to 2 decimals) - every later pass
+# and the parquet file carry 1-4 bytes per value instead of 8
+FEATURE_DTYPES = {
+    'pickup_hour': np.int8,
+    'pickup_day_of_week': np.int8,
+    'is_weekend': np.int8,
+    'trip_duration_min': np.int16,
+    'avg_speed_mph': np.float32,
+}
+
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_HOUR = 60 * NS_PER_MINUTE
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+# numba is optional - without it the duration, speed and time fields
+# are numpy expressions
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+if HAVE_NUMBA:
+    @njit(cache=True, parallel=True)
+    def _split_timestamps(pickup_ns, days, hours, dows):
+        # one fused pass over the int64 nanoseconds - day number, hour of
+        # day and day of week (1970-01-01 was a Thursday, 0=Monday)
+        for i in prange(pickup_ns.size):
+            day = pickup_ns[i] // NS_PER_DAY
+            days[i] = day
+            hours[i] = (pickup_ns[i] // NS_PER_HOUR) % 24
+            dows[i] = (day + 3) % 7
+    
+    @njit(cache=True, parallel=True)
+    def _duration_speed(pickup_ns, dropoff_ns, distance, durations, speeds):
+        # one fused pass - whole minutes rounded half up (as in
+        # _calculate_duration), then the speed over those minutes rounded
+        # to 0.01 mph and capped to 0-80 (as in _calculate_speed)
+        for i in prange(pickup_ns.size):
+            minutes = (dropoff_ns[i] - pickup_ns[i] + NS_PER_MINUTE // 2) // NS_PER_MINUTE
+            durations[i] = minutes
+            speed = round(distance[i] / minutes * 60, 2) if minutes > 0 else 0.0
+            if speed > 80:
+                speed = 80.0
+            elif speed < 0:
+                speed = 0.0
+            speeds[i] = speed
+
 class FeatureEngineer:
     """Add derived features to trip data"""
     
@@ -12,23 +73,51 @@ class FeatureEngineer:
         """Add all engineered features"""
         print("\nEngineering features...")
         
-        df = self._calculate_duration(df)
-        df = self._calculate_speed(df)
+        if HAVE_NUMBA:
+            df = self._calculate_duration_and_speed(df)
+        else:
+            df = self._calculate_duration(df)
+            df = self._calculate_speed(df)
         df = self._extract_time_features(df)
+        df = df.astype(FEATURE_DTYPES)
         
         print("Feature engineering complete")
         return df
     
+    def _calculate_duration_and_speed(self, df):
+        """
+        _calculate_duration and _calculate_speed in one compiled pass
+        over the timestamps and distances (needs numba)
+        """
+        print("  - Calculating trip duration and average speed...")
+        
+        pickup_ns = df['tpep_pickup_datetime'].to_numpy('datetime64[ns]').view(np.int64)
+        dropoff_ns = df['tpep_dropoff_datetime'].to_numpy('datetime64[ns]').view(np.int64)
+        distance = df['trip_distance'].to_numpy(np.float64)
+        
+        durations = np.empty(len(df), dtype=np.int32)
+        speeds = np.empty(len(df), dtype=np.float64)
+        _duration_speed(pickup_ns, dropoff_ns, distance, durations, speeds)
+        
+        df['trip_duration_min'] = durations
+        df['avg_speed_mph'] = speeds
+        
+        print(f"    Average duration: {durations.mean():.1f} minutes")
+        print(f"    Average speed: {df['avg_speed_mph'].mean():.1f} mph")
+        
+        return df
+    
     def _calculate_duration(self, df):
         """Calculate trip duration in minutes"""
         print("  - Calculating trip duration...")
         
-        df['trip_duration_min'] = (
-            df['tpep_dropoff_datetime'] - df['tpep_pickup_datetime']
-        ).dt.total_seconds() / 60
+        pickup_ns = df['tpep_pickup_datetime'].to_numpy('datetime64[ns]').view(np.int64)
+        dropoff_ns = df['tpep_dropoff_datetime'].to_numpy('datetime64[ns]').view(np.int64)
         
-        # round to integers
-        df['trip_duration_min'] = df['trip_duration_min'].round(0).astype(int)
+        # whole minutes, rounded half up, in integer arithmetic on the
+        # nanoseconds - no float timedelta column to round and cast
+        # (DataCleaner has already dropped NaT and trips over 24 hours)
+        df['trip_duration_min'] = ((dropoff_ns - pickup_ns + NS_PER_MINUTE // 2) // NS_PER_MINUTE).astype(np.int32)
         
         avg_duration = df['trip_duration_min'].mean()
         print(f"    Average duration: {avg_duration:.1f} minutes")
@@ -39,18 +128,20 @@ class FeatureEngineer:
         """Calculate average speed in mph"""
         print("  - Calculating average speed...")
         
-        # speed = distance / (time in hours)
-        df['avg_speed_mph'] = np.where(
-            df['trip_duration_min'] > 0,
-            (df['trip_distance'] / (df['trip_duration_min'] / 60)),
-            0
-        )
+        distance = df['trip_distance'].to_numpy(np.float64)
+        duration = df['trip_duration_min'].to_numpy(np.float64)
         
-        df['avg_speed_mph'] = df['avg_speed_mph'].round(2)
+        # speed = distance / (time in hours), 0 for zero-length trips -
+        # every step writes into the one output array
+        speed = np.zeros(len(df))
+        np.divide(distance, duration, out=speed, where=duration > 0)
+        speed *= 60
+        np.round(speed, 2, out=speed)
         
         # cap unrealistic speeds
-        df.loc[df['avg_speed_mph'] > 80, 'avg_speed_mph'] = 80
-        df.loc[df['avg_speed_mph'] < 0, 'avg_speed_mph'] = 0
+        np.clip(speed, 0, 80, out=speed)
+        
+        df['avg_speed_mph'] = speed
         
         avg_speed = df['avg_speed_mph'].mean()
         print(f"    Average speed: {avg_speed:.1f} mph")
@@ -61,43 +152,56 @@ class FeatureEngineer:
         """Extract hour, day of week, etc."""
         print("  - Extracting temporal features...")
         
+        hours, dows, days = self._time_fields(df['tpep_pickup_datetime'])
+        
         # hour of day (0-23)
-        df['pickup_hour'] = df['tpep_pickup_datetime'].dt.hour
+        df['pickup_hour'] = hours
         
         # day of week (0=Monday, 6=Sunday)
-        df['pickup_day_of_week'] = df['tpep_pickup_datetime'].dt.dayofweek
+        df['pickup_day_of_week'] = dows
         
         # is weekend
-        df['is_weekend'] = df['pickup_day_of_week'].isin([5, 6]).astype(int)
+        df['is_weekend'] = (dows >= 5).astype(np.int8)
         
-        # time category
-        df['time_category'] = df['pickup_hour'].apply(self._categorize_time)
+        # time category - one table lookup for the whole column
+        df['time_category'] = pd.Categorical.from_codes(HOUR_TIME_CODE[hours], categories=TIME_CATEGORIES)
         
-        # date
-        df['pickup_date'] = df['tpep_pickup_datetime'].dt.date
+        # date - the day number as datetime64, not a datetime.date
+        # object per row
+        df['pickup_date'] = days.astype('datetime64[D]')
         
         weekend_pct = (df['is_weekend'].sum() / len(df)) * 100
         print(f"    Weekend trips: {weekend_pct:.1f}%")
         
         return df
     
-    def _categorize_time(self, hour):
-        """Categorize hour into time period"""
-        if 6 <= hour < 9:
-            return 'Morning Rush'
-        elif 9 <= hour < 16:
-            return 'Midday'
-        elif 16 <= hour < 19:
-            return 'Evening Rush'
+    def _time_fields(self, pickup):
+        """
+        (hour, day of week, day number) int arrays for a datetime column
+        
+        All three come from one read of its int64 nanoseconds, instead
+        of a separate .dt pass (and division) for each
+        """
+        pickup_ns = pickup.to_numpy('datetime64[ns]').view(np.int64)
+        
+        if HAVE_NUMBA:
+            days = np.empty(pickup_ns.size, dtype=np.int64)
+            hours = np.empty(pickup_ns.size, dtype=np.int8)
+            dows = np.empty(pickup_ns.size, dtype=np.int8)
+            _split_timestamps(pickup_ns, days, hours, dows)
         else:
-            return 'Night'
+            days = pickup_ns // NS_PER_DAY
+            hours = (pickup_ns // NS_PER_HOUR % 24).astype(np.int8)
+            dows = ((days + 3) % 7).astype(np.int8)
+        
+        return hours, dows, days
     
     def get_feature_summary(self, df):
         """Get summary of engineered features"""
         summary = {
             'avg_duration_min': df['trip_duration_min'].mean(),
             'avg_speed_mph': df['avg_speed_mph'].mean(),
-            'rush_hour_trips': len(df[df['time_category'].isin(['Morning Rush', 'Evening Rush'])]),
+            'rush_hour_trips': int(np.isin(df['time_category'].cat.codes.to_numpy(), RUSH_HOUR_CODES).sum()),
             'weekend_trips': df['is_weekend'].sum(),
             'weekday_trips': len(df) - df['is_weekend'].sum()
         }
@@ -3,15 +3,36 @@ Data loading - reads raw parquet and CSV files
 """
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import json
 import os
 from dotenv import load_dotenv
 
+# orjson is optional - it parses the zone GeoJSON's coordinate arrays
+# several times faster than json
+try:
+    import orjson
+    HAVE_ORJSON = True
+except ImportError:
+    HAVE_ORJSON = False
+
 load_dotenv()
 
 class DataLoader:
     """Load raw data files"""
     
+    # trip columns the cleaning, feature and validation steps use -
+    # the rest of the file is never read
+    TRIP_COLUMNS = [
+        'tpep_pickup_datetime', 'tpep_dropoff_datetime', 'passenger_count',
+        'trip_distance', 'PULocationID', 'DOLocationID',
+        'fare_amount', 'tip_amount', 'total_amount',
+    ]
+    
+    # trips per DataFrame from iter_trip_batches
+    BATCH_SIZE = 500_000
+    
     def __init__(self):
         self.raw_dir = os.getenv('RAW_DATA_DIR', 'data/raw')
         self.parquet_file = os.getenv('PARQUET_FILE', 'yellow_tripdata.parquet')
@@ -31,15 +52,67 @@ class DataLoader:
             raise FileNotFoundError(f"Trip data not found: {file_path}")
         
         if sample:
-            df = pd.read_parquet(file_path, engine='pyarrow')
-            df = df.head(sample)
+            df = self._read_trips(file_path, sample)
             print(f"Loaded {len(df)} sample trips")
         else:
-            df = pd.read_parquet(file_path, engine='pyarrow')
+            df = self._read_trips(file_path)
             print(f"Loaded {len(df)} trips")
         
         return df
     
+    def iter_trip_batches(self, sample=None):
+        """
+        Yield the trip data as DataFrames of up to BATCH_SIZE trips
+        sample: if int, stop after that many rows (for testing)
+        
+        Only one batch is in memory at a time, whatever the file size
+        """
+        file_path = os.path.join(self.raw_dir, self.parquet_file)
+        
+        print(f"Streaming trip data from {file_path}...")
+        
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Trip data not found: {file_path}")
+        
+        batch_size = min(sample, self.BATCH_SIZE) if sample else self.BATCH_SIZE
+        remaining = sample
+        
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=batch_size, columns=self.TRIP_COLUMNS):
+            if remaining is not None:
+                batch = batch.slice(0, remaining)
+                remaining -= batch.num_rows
+            
+            table = pa.Table.from_batches([batch])
+            del batch
+            yield table.to_pandas(split_blocks=True, self_destruct=True)
+            
+            if remaining == 0:
+                break
+    
+    def _read_trips(self, file_path, sample=None):
+        """
+        Read TRIP_COLUMNS of the trips parquet file into a DataFrame
+        
+        With sample, only the first sample rows - batches are read
+        until there are enough, not the whole file. Each column is converted to its own numpy block and its Arrow
+        buffers are released as it goes, so the file isn't held in
+        memory twice (Arrow + pandas) at the peak
+        """
+        if sample:
+            parquet = pq.ParquetFile(file_path)
+            batches = []
+            rows = 0
+            for batch in parquet.iter_batches(batch_size=sample, columns=self.TRIP_COLUMNS):
+                batches.append(batch)
+                rows += batch.num_rows
+                if rows >= sample:
+                    break
+            schema = pa.schema([parquet.schema_arrow.field(col) for col in self.TRIP_COLUMNS])
+            table = pa.Table.from_batches(batches, schema=schema).slice(0, sample)
+        else:
+            table = pq.read_table(file_path, columns=self.TRIP_COLUMNS)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    
     def load_zone_lookup(self):
         """Load zone lookup CSV"""
         file_path = os.path.join(self.raw_dir, self.zone_lookup_file)
@@ -49,7 +122,10 @@ class DataLoader:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Zone lookup not found: {file_path}")
         
-        df = pd.read_csv(file_path)
+        # parsed multi-threaded by Arrow; Borough and service_zone have a
+        # handful of distinct values each, so they're categories
+        df = pd.read_csv(file_path, engine='pyarrow',
+                         dtype={'Borough': 'category', 'service_zone': 'category'})
         print(f"Loaded {len(df)} zones")
         
         return df
@@ -63,8 +139,12 @@ class DataLoader:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"GeoJSON not found: {file_path}")
         
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+        if HAVE_ORJSON:
+            with open(file_path, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
         
         print(f"Loaded {len(data.get('features', []))} zone geometries")
         
@@ -73,14 +153,27 @@ class DataLoader:
     def verify_files_exist(self):
         """Check if all required files exist"""
         files = {
-            'trip_data': os.path.join(self.raw_dir, self.parquet_file),
-            'zone_lookup': os.path.join(self.raw_dir, self.zone_lookup_file),
-            'zone_geojson': os.path.join(self.raw_dir, self.zone_geojson_file)
+            'trip_data': self.parquet_file,
+            'zone_lookup': self.zone_lookup_file,
+            'zone_geojson': self.zone_geojson_file
         }
         
+        # one directory listing instead of a stat per file. Only bare file
+        # names are looked up in it - an absolute path or one in a
+        # subdirectory isn't in raw_dir's listing, so it gets a stat
+        try:
+            present = set(os.listdir(self.raw_dir))
+        except FileNotFoundError:
+            present = set()
+        
         missing = []
-        for name, path in files.items():
-            if not os.path.exists(path):
+        for name, file_name in files.items():
+            path = os.path.join(self.raw_dir, file_name)
+            if os.path.basename(file_name) == file_name:
+                found = file_name in present
+            else:
+                found = os.path.exists(path)
+            if not found:
                 missing.append(f"{name}: {path}")
         
         if missing:
@@ -4,6 +4,8 @@ Main pipeline runner - orchestrates data loading, cleaning, and processing
 
 import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -14,6 +16,16 @@ from validate_data import DataValidator
 
 load_dotenv()
 
+# cleaned trips parquet layout - dictionary pages for the repeated values
+# (time_category, hours, zone ids), zstd, and large row groups so the
+# seed reads few of them
+PARQUET_OPTIONS = {
+    'compression': 'zstd',
+    'use_dictionary': True,
+    'data_page_size': 1 << 20,
+}
+ROW_GROUP_SIZE = 1_000_000
+
 def run_pipeline(sample_size=None):
     """
     Run the complete data pipeline
@@ -45,43 +57,65 @@ def run_pipeline(sample_size=None):
             print("    - taxi_zones.geojson")
             return False
         
-        trips_df = loader.load_trip_data(sample=sample_size)
         zones_df = loader.load_zone_lookup()
         geojson = loader.load_zone_geojson()
         
-        # step 2: clean data
-        print("\n[STEP 2/5] Cleaning data...")
-        cleaner = DataCleaner()
-        trips_df = cleaner.clean(trips_df)
+        output_dir = os.getenv('PROCESSED_DATA_DIR', 'data/processed')
+        os.makedirs(output_dir, exist_ok=True)
+        output_file = os.path.join(output_dir, 'cleaned_trips.parquet')
         
-        # step 3: engineer features
-        print("\n[STEP 3/5] Engineering features...")
+        # steps 2-5 run per batch of trips - load, clean, engineer,
+        # validate, write, then drop it, so memory holds one batch
+        # rather than the whole file
+        cleaner = DataCleaner()
         engineer = FeatureEngineer()
-        trips_df = engineer.engineer(trips_df)
-        
-        # step 4: validate
-        print("\n[STEP 4/5] Validating data...")
         validator = DataValidator()
-        is_valid = validator.validate(trips_df)
+        writer = None
+        record_count = 0
         
-        if not is_valid:
+        try:
+            for trips_df in loader.iter_trip_batches(sample=sample_size):
+                # step 2: clean data
+                print("\n[STEP 2/5] Cleaning data...")
+                trips_df = cleaner.clean(trips_df)
+                if trips_df.empty:
+                    continue
+                
+                # step 3: engineer features
+                print("\n[STEP 3/5] Engineering features...")
+                trips_df = engineer.engineer(trips_df)
+                
+                # step 4: validate
+                print("\n[STEP 4/5] Validating data...")
+                if not validator.validate(trips_df):
+                    break
+                validator.add_to_summary(trips_df)
+                
+                # step 5: save processed data
+                print("\n[STEP 5/5] Saving processed data...")
+                table = pa.Table.from_pandas(trips_df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, table.schema, **PARQUET_OPTIONS)
+                writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+                record_count += len(trips_df)
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        if not validator.is_valid:
+            # don't leave a partial file for the seed to pick up
+            if os.path.exists(output_file):
+                os.remove(output_file)
             print("\n✗ Validation failed! Check errors above.")
             return False
         
         # get summary
-        summary = validator.get_summary(trips_df)
-        
-        # step 5: save processed data
-        print("\n[STEP 5/5] Saving processed data...")
-        output_dir = os.getenv('PROCESSED_DATA_DIR', 'data/processed')
-        os.makedirs(output_dir, exist_ok=True)
-        
-        output_file = os.path.join(output_dir, 'cleaned_trips.parquet')
-        trips_df.to_parquet(output_file, engine='pyarrow', index=False)
+        summary = validator.get_summary()
         print(f"Saved to: {output_file}")
         
-        zones_output = os.path.join(output_dir, 'zones.csv')
-        zones_df.to_csv(zones_output, index=False)
+        # parquet - Borough and service_zone are written dictionary encoded
+        zones_output = os.path.join(output_dir, 'zones.parquet')
+        zones_df.to_parquet(zones_output, engine='pyarrow', index=False, **PARQUET_OPTIONS)
         print(f"Saved zones to: {zones_output}")
         
         # save cleaning log
@@ -91,7 +125,7 @@ def run_pipeline(sample_size=None):
         print("PIPELINE COMPLETE")
         print("="*60)
         print(f"Finished: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Final record count: {len(trips_df):,}")
+        print(f"Final record count: {record_count:,}")
         print("="*60)
         
         print("\nNext steps:")
@@ -2,24 +2,72 @@
 Data validation - verify data quality after processing
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 
+# columns get_summary reports the mean of
+SUMMARY_MEAN_COLUMNS = ['fare_amount', 'trip_distance', 'trip_duration_min', 'avg_speed_mph']
+
+def _count_out_of_range(column, min_val, max_val):
+    """Values of a Series outside [min_val, max_val] (nulls don't count)"""
+    # counted on the column's array - the offending rows are never copied out
+    values = column.to_numpy()
+    return int(np.count_nonzero((values < min_val) | (values > max_val)))
+
+def _count_nulls(column):
+    """Null values in a Series"""
+    return int(column.isna().sum())
+
 class DataValidator:
     """Validate processed data before loading to database"""
     
     def __init__(self):
         self.validation_results = []
         self.is_valid = True
+        self.summary_totals = self._empty_summary_totals()
+    
+    @staticmethod
+    def _empty_summary_totals():
+        return {
+            'total_records': 0,
+            'start': None,
+            'end': None,
+            'sums': dict.fromkeys(SUMMARY_MEAN_COLUMNS, 0.0),
+            'counts': dict.fromkeys(SUMMARY_MEAN_COLUMNS, 0),
+            'total_revenue': 0.0,
+        }
     
     def validate(self, df):
-        """Run all validation checks"""
+        """
+        Run all validation checks
+        
+        Can be called once per batch - a failure in any batch leaves
+        is_valid False
+        """
         print("\nValidating processed data...")
         
-        self._check_required_columns(df)
-        self._check_data_types(df)
-        self._check_value_ranges(df)
-        self._check_nulls(df)
-        self._check_duplicates(df)
+        checks = [
+            self._check_required_columns,
+            self._check_data_types,
+            self._check_value_ranges,
+            self._check_nulls,
+            self._check_duplicates,
+        ]
+        
+        # the checks only read df, and the scans release the GIL, so they
+        # overlap on separate cores. Each returns (output lines, issues),
+        # reported here in check order
+        with ThreadPoolExecutor(max_workers=len(checks)) as ex:
+            reports = list(ex.map(lambda check: check(df), checks))
+        
+        for lines, issues in reports:
+            for line in lines:
+                print(line)
+            if issues:
+                self.is_valid = False
+                self.validation_results.extend(issues)
         
         if self.is_valid:
             print("\n✓ All validation checks passed")
@@ -29,7 +77,7 @@ class DataValidator:
         return self.is_valid
     
     def _check_required_columns(self, df):
-        """Check if all required columns exist"""
+        """Check if all required columns exist - returns (output lines, issues)"""
         required = [
             'tpep_pickup_datetime',
             'tpep_dropoff_datetime',
@@ -48,14 +96,11 @@ class DataValidator:
         missing = [col for col in required if col not in df.columns]
         
         if missing:
-            print(f"  ✗ Missing columns: {missing}")
-            self.is_valid = False
-            self.validation_results.append(f"Missing columns: {missing}")
-        else:
-            print(f"  ✓ All required columns present")
+            return [f"  ✗ Missing columns: {missing}"], [f"Missing columns: {missing}"]
+        return [f"  ✓ All required columns present"], []
     
     def _check_data_types(self, df):
-        """Check if columns have correct data types"""
+        """Check if columns have correct data types - returns (output lines, issues)"""
         checks = {
             'trip_distance': 'numeric',
             'fare_amount': 'numeric',
@@ -75,14 +120,11 @@ class DataValidator:
                     issues.append(f"{col} is not numeric")
         
         if issues:
-            print(f"  ✗ Data type issues: {issues}")
-            self.is_valid = False
-            self.validation_results.extend(issues)
-        else:
-            print(f"  ✓ All data types correct")
+            return [f"  ✗ Data type issues: {issues}"], issues
+        return [f"  ✓ All data types correct"], []
     
     def _check_value_ranges(self, df):
-        """Check if values are in expected ranges"""
+        """Check if values are in expected ranges - returns (output lines, issues)"""
         checks = [
             ('trip_distance', 0.1, 100, 'miles'),
             ('fare_amount', 0, 500, 'dollars'),
@@ -97,21 +139,16 @@ class DataValidator:
             if col not in df.columns:
                 continue
             
-            out_of_range = df[(df[col] < min_val) | (df[col] > max_val)]
-            if len(out_of_range) > 0:
-                issues.append(f"{col}: {len(out_of_range)} values outside [{min_val}, {max_val}] {unit}")
+            out_of_range = _count_out_of_range(df[col], min_val, max_val)
+            if out_of_range > 0:
+                issues.append(f"{col}: {out_of_range} values outside [{min_val}, {max_val}] {unit}")
         
         if issues:
-            print(f"  ✗ Value range issues:")
-            for issue in issues:
-                print(f"     - {issue}")
-            self.is_valid = False
-            self.validation_results.extend(issues)
-        else:
-            print(f"  ✓ All values in expected ranges")
+            return [f"  ✗ Value range issues:"] + [f"     - {issue}" for issue in issues], issues
+        return [f"  ✓ All values in expected ranges"], []
     
     def _check_nulls(self, df):
-        """Check for unexpected null values"""
+        """Check for unexpected null values - returns (output lines, issues)"""
         critical_cols = [
             'tpep_pickup_datetime',
             'tpep_dropoff_datetime',
@@ -125,46 +162,79 @@ class DataValidator:
             if col not in df.columns:
                 continue
             
-            nulls = df[col].isna().sum()
+            nulls = _count_nulls(df[col])
             if nulls > 0:
                 issues.append(f"{col}: {nulls} null values")
         
         if issues:
-            print(f"  ✗ Null value issues:")
-            for issue in issues:
-                print(f"     - {issue}")
-            self.is_valid = False
-            self.validation_results.extend(issues)
-        else:
-            print(f"  ✓ No unexpected null values")
+            return [f"  ✗ Null value issues:"] + [f"     - {issue}" for issue in issues], issues
+        return [f"  ✓ No unexpected null values"], []
     
     def _check_duplicates(self, df):
-        """Check for duplicates"""
-        dupes = df.duplicated(
-            subset=['tpep_pickup_datetime', 'tpep_dropoff_datetime',
-                   'PULocationID', 'DOLocationID']
-        ).sum()
+        """Check for duplicates - returns (output lines, issues)"""
+        keys = df[['tpep_pickup_datetime', 'tpep_dropoff_datetime',
+                   'PULocationID', 'DOLocationID']]
+        
+        # one uint64 hash per row, and the exact multi-column check only
+        # on rows whose hash repeats (every true duplicate is among them)
+        hashes = pd.util.hash_pandas_object(keys, index=False)
+        candidates = hashes.duplicated(keep=False).to_numpy()
+        dupes = int(keys[candidates].duplicated().sum()) if candidates.any() else 0
         
         if dupes > 0:
-            print(f"  ✗ Found {dupes} potential duplicates")
-            self.is_valid = False
-            self.validation_results.append(f"{dupes} duplicates found")
-        else:
-            print(f"  ✓ No duplicates found")
+            return [f"  ✗ Found {dupes} potential duplicates"], [f"{dupes} duplicates found"]
+        return [f"  ✓ No duplicates found"], []
     
-    def get_summary(self, df):
-        """Get data summary stats"""
+    def add_to_summary(self, df):
+        """
+        Fold one batch of processed trips into the totals get_summary
+        reports - sums and counts, so no batch has to be kept
+        """
+        totals = self.summary_totals
+        totals['total_records'] += len(df)
+        
+        # every statistic in one agg call - one reduction per column
+        stats = df.agg({
+            'tpep_pickup_datetime': ['min', 'max'],
+            **dict.fromkeys(SUMMARY_MEAN_COLUMNS, ['sum', 'count']),
+            'total_amount': ['sum'],
+        })
+        
+        start = stats.at['min', 'tpep_pickup_datetime']
+        end = stats.at['max', 'tpep_pickup_datetime']
+        if pd.notna(start) and (totals['start'] is None or start < totals['start']):
+            totals['start'] = start
+        if pd.notna(end) and (totals['end'] is None or end > totals['end']):
+            totals['end'] = end
+        
+        for col in SUMMARY_MEAN_COLUMNS:
+            totals['sums'][col] += float(stats.at['sum', col])
+            totals['counts'][col] += int(stats.at['count', col])
+        totals['total_revenue'] += float(stats.at['sum', 'total_amount'])
+    
+    def get_summary(self, df=None):
+        """
+        Get data summary stats - of df, or without it of every batch
+        passed to add_to_summary
+        """
+        if df is not None:
+            self.summary_totals = self._empty_summary_totals()
+            self.add_to_summary(df)
+        
+        totals = self.summary_totals
+        means = {col: totals['sums'][col] / totals['counts'][col] if totals['counts'][col] else float('nan')
+                 for col in SUMMARY_MEAN_COLUMNS}
         summary = {
-            'total_records': len(df),
+            'total_records': totals['total_records'],
             'date_range': {
-                'start': df['tpep_pickup_datetime'].min(),
-                'end': df['tpep_pickup_datetime'].max()
+                'start': totals['start'],
+                'end': totals['end']
             },
-            'avg_fare': df['fare_amount'].mean(),
-            'avg_distance': df['trip_distance'].mean(),
-            'avg_duration': df['trip_duration_min'].mean(),
-            'avg_speed': df['avg_speed_mph'].mean(),
-            'total_revenue': df['total_amount'].sum()
+            'avg_fare': means['fare_amount'],
+            'avg_distance': means['trip_distance'],
+            'avg_duration': means['trip_duration_min'],
+            'avg_speed': means['avg_speed_mph'],
+            'total_revenue': totals['total_revenue']
         }
         
         print("\nData Summary:")
@@ -0,0 +1,94 @@
+"""
+Shared test fixtures - a small SQLite database seeded through
+database/seed.py, the same way a real one is built
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the backend, pipeline and seed modules import each other by bare name
+for subdir in ('backend', 'pipeline', 'database'):
+    sys.path.insert(0, os.path.join(ROOT, subdir))
+
+# config reads these once, at import - point everything at the test
+# database and keep the cache warmer off
+TEST_DIR = tempfile.mkdtemp(prefix='taxi-tests-')
+os.environ['DB_PATH'] = os.path.join(TEST_DIR, 'taxi.db')
+os.environ['WARM_INTERVAL'] = '0'
+
+SCHEMA_PATH = os.path.join(ROOT, 'database', 'schema.sql')
+
+# (LocationID, Borough, Zone, service_zone)
+ZONES = [
+    (1, 'EWR', 'Newark Airport', 'EWR'),
+    (132, 'Queens', 'JFK Airport', 'Airports'),
+    (161, 'Manhattan', 'Midtown Center', 'Yellow Zone'),
+    (237, 'Manhattan', 'Upper East Side South', 'Yellow Zone'),
+]
+
+START = datetime(2024, 1, 15, 8, 0, 0)
+
+
+def make_trip(i, fare=10.0, distance=2.0, minutes=12, pickup=None, pu=161, do=237,
+              tip=1.0, total=None, passengers=1):
+    """One trip as a row of the cleaned trips Parquet file"""
+    pickup = pickup or START + timedelta(minutes=7 * i)
+    return {
+        'tpep_pickup_datetime': pickup,
+        'tpep_dropoff_datetime': pickup + timedelta(minutes=minutes),
+        'passenger_count': float(passengers),
+        'trip_distance': distance,
+        'PULocationID': pu,
+        'DOLocationID': do,
+        'fare_amount': fare,
+        'tip_amount': tip,
+        'total_amount': fare + tip + 1.0 if total is None else total,
+        'trip_duration_min': float(minutes),
+        'avg_speed_mph': distance / minutes * 60,
+        'pickup_hour': pickup.hour,
+    }
+
+
+# 25 trips - a few share a pickup time, so pages have to break ties on trip_id
+TRIPS = [make_trip(i, fare=5.0 + 1.25 * i, distance=0.5 + 0.3 * i,
+                   pickup=START if i in (3, 4, 5) else None,
+                   pu=ZONES[i % len(ZONES)][0], do=ZONES[(i + 1) % len(ZONES)][0])
+         for i in range(25)]
+
+
+def seed_trips(db_path, trips, work_dir):
+    """Build db_path from trips (make_trip rows) and ZONES with seed.py"""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from seed import seed_database
+
+    trips_path = os.path.join(work_dir, 'cleaned_trips.parquet')
+    zones_path = os.path.join(work_dir, 'taxi_zone_lookup.csv')
+
+    # timestamps are written as microseconds, like the pipeline's output
+    pq.write_table(pa.Table.from_pylist(trips), trips_path)
+    pd.DataFrame(ZONES, columns=['LocationID', 'Borough', 'Zone', 'service_zone']).to_csv(zones_path, index=False)
+
+    seed_database(db_path, SCHEMA_PATH, trips_path, zones_path)
+    return db_path
+
+
+@pytest.fixture(scope='session')
+def db_path():
+    """The seeded TRIPS database the app's DB_PATH points at"""
+    return seed_trips(os.environ['DB_PATH'], TRIPS, TEST_DIR)
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """Seed a throwaway database from a list of make_trip rows"""
+    def make(trips):
+        return seed_trips(str(tmp_path / 'taxi.db'), trips, str(tmp_path))
+    return make
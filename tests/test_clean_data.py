@@ -0,0 +1,45 @@
+"""
+DataCleaner - duplicate removal within and across streamed batches
+"""
+
+import pandas as pd
+
+from clean_data import DataCleaner
+from conftest import make_trip
+
+
+def batch(*indexes):
+    return pd.DataFrame([make_trip(i) for i in indexes])
+
+
+def kept(df):
+    return sorted(df['tpep_pickup_datetime'].tolist())
+
+
+def test_duplicates_in_a_batch_are_removed():
+    cleaner = DataCleaner()
+    df = cleaner.clean(batch(1, 2, 2, 3, 1))
+
+    assert kept(df) == kept(batch(1, 2, 3))
+    assert cleaner.stats == {'original_count': 5, 'final_count': 3, 'removed_count': 2}
+
+
+def test_duplicates_across_batches_are_removed():
+    cleaner = DataCleaner()
+    cleaner.clean(batch(1, 2))
+
+    # enough batches for the seen hashes to be merged into fewer runs
+    for start in range(10, 100, 10):
+        df = cleaner.clean(batch(start, start + 1, 1, start - 9))
+        assert kept(df) == kept(batch(start, start + 1))
+
+    assert cleaner.stats['final_count'] == 2 + 2 * 9
+
+
+def test_reset_starts_a_new_run():
+    cleaner = DataCleaner()
+    cleaner.clean(batch(1, 2))
+    cleaner.reset()
+
+    assert cleaner.stats == {'original_count': 0, 'final_count': 0, 'removed_count': 0}
+    assert len(cleaner.clean(batch(1, 2))) == 2
@@ -0,0 +1,22 @@
+"""
+db.ensure_indexes - startup migrations for databases seeded earlier
+"""
+
+import sqlite3
+
+from config import Config
+from conftest import TRIPS
+from db import ensure_indexes
+from models.zone import Zone
+
+
+def test_missing_fts_table_is_created_and_filled(make_db):
+    db_path = make_db(TRIPS)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE zones_fts")
+    conn.commit()
+    conn.close()
+
+    ensure_indexes(db_path, Config.STARTUP_INDEXES, Config.STARTUP_FTS_TABLES)
+
+    assert [zone['zone'] for zone in Zone(db_path).search('jfk')] == ['JFK Airport']
@@ -0,0 +1,81 @@
+"""
+Optional database drivers - the apsw connection (DB_DRIVER=apsw) and the
+DuckDB analytics engine (ANALYTICS_ENGINE=duckdb) must return what
+sqlite3 does
+"""
+
+import sqlite3
+
+import pytest
+
+import _apsw
+import duckdb_engine
+from db import fetch_columns
+
+ZONE_QUERY = "SELECT location_id, zone, borough FROM zones WHERE location_id = ?"
+SCAN_QUERY = """
+    SELECT pickup_location_id, COUNT(*) as trips, SUM(fare_amount) / 100.0 as revenue
+    FROM trips
+    GROUP BY pickup_location_id
+    ORDER BY pickup_location_id
+"""
+
+
+def sqlite_rows(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def apsw_conn(db_path):
+    if not _apsw.HAVE_APSW:
+        pytest.skip('apsw is not installed')
+    conn = _apsw.Connection(db_path, cached_statements=16)
+    yield conn
+    conn.close()
+
+
+def test_apsw_rows_act_like_sqlite3_rows(apsw_conn):
+    apsw_conn.row_factory = sqlite3.Row
+    row = apsw_conn.cursor().execute(ZONE_QUERY, (132,)).fetchone()
+
+    assert row['zone'] == 'JFK Airport'
+    assert row[0] == 132
+    assert dict(row) == {'location_id': 132, 'zone': 'JFK Airport', 'borough': 'Queens'}
+
+
+def test_apsw_fetch_columns_matches_sqlite3(apsw_conn, db_path):
+    columns, rows = fetch_columns(apsw_conn.cursor(), SCAN_QUERY)
+
+    assert columns == ['pickup_location_id', 'trips', 'revenue']
+    assert [tuple(row) for row in rows] == sqlite_rows(db_path, SCAN_QUERY)
+    assert not apsw_conn.in_transaction
+
+
+def test_apsw_errors_are_sqlite3_errors(apsw_conn):
+    with pytest.raises(sqlite3.OperationalError):
+        apsw_conn.execute("SELECT * FROM no_such_table")
+
+
+@pytest.fixture
+def duckdb_path(db_path):
+    if not duckdb_engine.HAVE_DUCKDB:
+        pytest.skip('duckdb is not installed')
+    if not duckdb_engine.available(db_path):
+        pytest.skip("duckdb's sqlite extension is not available")
+    return db_path
+
+
+def test_duckdb_scan_matches_sqlite3(duckdb_path):
+    rows = duckdb_engine.fetchall(duckdb_path, SCAN_QUERY)
+
+    assert [tuple(row) for row in rows] == sqlite_rows(duckdb_path, SCAN_QUERY)
+    assert rows[0]['trips'] == rows[0][1]
+
+
+def test_duckdb_errors_are_sqlite3_errors(duckdb_path):
+    with pytest.raises(sqlite3.OperationalError):
+        duckdb_engine.fetchall(duckdb_path, "SELECT * FROM no_such_table")
@@ -0,0 +1,33 @@
+"""
+QueryService.get_fare_distribution - binned like numpy.histogram
+"""
+
+import numpy as np
+import pytest
+
+from conftest import make_trip
+from services.query_service import QueryService
+
+# $2.50 - $12.50: with 10 bins each is exactly $1 wide, so $3.50, $7.50
+# etc. sit right on an edge; $12.50 is the max and closes the last bin
+FARES = [2.50, 2.51, 3.49, 3.50, 3.50, 4.50, 5.99, 7.50, 7.50, 7.51,
+         8.25, 9.50, 10.00, 11.49, 11.50, 12.49, 12.50, 12.50]
+
+
+@pytest.fixture
+def fares_db(make_db):
+    return make_db([make_trip(i, fare=fare) for i, fare in enumerate(FARES)])
+
+
+@pytest.mark.parametrize('bins', [10, 4, 7, 1])
+def test_fare_distribution_matches_numpy_histogram(fares_db, bins):
+    distribution = QueryService(fares_db).get_fare_distribution(bins=bins)
+
+    # fares are stored in cents - bin them the same way
+    cents = np.round(np.array(FARES) * 100)
+    counts, edges = np.histogram(cents, bins=bins)
+
+    assert [b['count'] for b in distribution] == counts.tolist()
+    assert [b['bin_start'] for b in distribution] == np.round(edges[:-1] / 100, 2).tolist()
+    assert distribution[-1]['bin_end'] == 12.50
+    assert sum(b['count'] for b in distribution) == len(FARES)
@@ -0,0 +1,63 @@
+"""
+seed.py - money stored as integer cents, distance/speed as hundredths
+"""
+
+import sqlite3
+from datetime import datetime
+
+from conftest import make_trip
+from db import to_hundredths
+from models.trip import Trip
+
+
+def stored(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_amounts_are_stored_as_hundredths(make_db):
+    db_path = make_db([make_trip(0, fare=12.35, distance=0.29, tip=0.1, total=13.45)])
+
+    assert stored(db_path, """
+        SELECT fare_amount, tip_amount, total_amount, trip_distance,
+               typeof(fare_amount), typeof(trip_distance)
+        FROM trips
+    """) == [(1235, 10, 1345, 29, 'integer', 'integer')]
+
+
+def test_trip_comes_back_in_dollars_and_miles(make_db):
+    db_path = make_db([make_trip(0, fare=12.35, distance=0.29, tip=0.1, total=13.45)])
+
+    trip = Trip(db_path).get_by_id(1)
+    assert (trip['fare_amount'], trip['tip_amount'], trip['total_amount'], trip['trip_distance']) \
+        == (12.35, 0.1, 13.45, 0.29)
+
+
+def test_filters_match_scaled_values(make_db):
+    # 0.29 * 100 is 28.999... - the filter value has to round to 29
+    assert to_hundredths(0.29) == 29
+    db_path = make_db([make_trip(0, distance=0.29), make_trip(1, distance=0.30)])
+
+    trip = Trip(db_path)
+    assert trip.count({'min_distance': 0.29, 'max_distance': 0.29}) == 1
+    assert trip.count({'min_distance': 0.29}) == 2
+
+
+def test_amounts_rounding_to_zero_are_skipped(make_db):
+    db_path = make_db([
+        make_trip(0),
+        make_trip(1, total=0.004),
+        make_trip(2, distance=0.004),
+    ])
+
+    assert stored(db_path, "SELECT COUNT(*) FROM trips") == [(1,)]
+
+
+def test_fractional_seconds_are_truncated(make_db):
+    db_path = make_db([make_trip(0, pickup=datetime(2024, 1, 15, 8, 0, 0, 750000))])
+
+    assert stored(db_path, "SELECT pickup_datetime, dropoff_datetime FROM trips") \
+        == [('2024-01-15 08:00:00', '2024-01-15 08:12:00')]
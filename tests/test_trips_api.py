@@ -0,0 +1,84 @@
+"""
+GET /api/trips - keyset cursors and the columns/rows response
+"""
+
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from db import TRIP_COLUMNS
+from routes.trips import decode_cursor, encode_cursor, trips_bp
+
+
+@pytest.fixture(scope='module')
+def client(db_path):
+    app = Flask(__name__)
+    app.register_blueprint(trips_bp)
+    return app.test_client()
+
+
+def newest_first_ids(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT trip_id FROM trips ORDER BY pickup_datetime DESC, trip_id DESC")
+        return [trip_id for trip_id, in rows]
+    finally:
+        conn.close()
+
+
+def test_cursor_round_trip():
+    token = encode_cursor('2024-01-15 08:21:00', 42)
+    assert decode_cursor(token) == ('2024-01-15 08:21:00', 42)
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get('/api/trips?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_columns_rows_shape(client, db_path):
+    data = client.get('/api/trips?per_page=3').get_json()
+
+    assert data['columns'] == list(TRIP_COLUMNS)
+    assert len(data['rows']) == 3
+    assert all(len(row) == len(TRIP_COLUMNS) for row in data['rows'])
+
+    pagination = data['pagination']
+    assert pagination['per_page'] == 3
+    assert pagination['total'] == 25
+    assert 'page' not in pagination and 'pages' not in pagination
+
+
+@pytest.mark.parametrize('per_page', [5, 7])
+def test_cursor_walks_every_trip_once(client, db_path, per_page):
+    # 25 trips: with 5 per page the last full page still has a cursor
+    # and the page after it is empty; with 7 the short last page ends it
+    seen = []
+    cursor = None
+    while True:
+        url = f'/api/trips?per_page={per_page}'
+        if cursor:
+            url += f'&cursor={cursor}'
+        data = client.get(url).get_json()
+
+        trip_id = data['columns'].index('trip_id')
+        seen.extend(row[trip_id] for row in data['rows'])
+        cursor = data['pagination']['next_cursor']
+        if cursor is None:
+            assert len(data['rows']) < per_page
+            break
+
+    assert seen == newest_first_ids(db_path)
+
+
+def test_per_page_is_clamped(client):
+    for per_page in (0, -3):
+        response = client.get(f'/api/trips?per_page={per_page}')
+        assert response.status_code == 200
+        assert len(response.get_json()['rows']) == 1
+
+
+def test_page_numbers_are_rejected(client):
+    assert client.get('/api/trips?page=2').status_code == 400
+    assert client.get('/api/trips?page=1').status_code == 200
@@ -0,0 +1,24 @@
+"""
+Zone.search - FTS word prefixes, then the escaped LIKE fallback
+"""
+
+from models.zone import Zone
+
+
+def names(results):
+    return [zone['zone'] for zone in results]
+
+
+def test_word_prefixes_use_the_full_text_index(db_path):
+    assert names(Zone(db_path).search('upp east')) == ['Upper East Side South']
+
+
+def test_text_inside_a_word_falls_back_to_like(db_path):
+    zone = Zone(db_path)
+    assert names(zone.search('port')) == ['JFK Airport', 'Newark Airport']
+    assert names(zone.search('eens')) == ['JFK Airport']
+
+
+def test_like_wildcards_are_matched_literally(db_path):
+    assert Zone(db_path).search('5%') == []
+    assert Zone(db_path).search('_') == []